@@ -1,7 +1,7 @@
 import ROOT
+import numpy
 import time
 
-import TupleReader as reader
 import HistManager
 import EventCounter
 
@@ -11,6 +11,10 @@ class Analysis(object):
     """Baseclass for all analyses. Common functionality should go here.
     This class handles some of the technicalities that are common to all analyses.    
     """
+    # Names of the tuple branches the analysis reads, None activates all branches known to the TupleReader
+    RequiredBranches = None
+    # Cuts of the selection in the order they are applied, they are counted between the "all" and "final" cuts
+    Cuts = []
 
     def __init__(self, auxName):
         super(Analysis, self).__init__()
@@ -20,36 +24,74 @@ class Analysis(object):
         self.isData       = False
 
         # Functionality providers
-        self.Store        = reader.TupleReader()
+        self.Store        = None
         self.EventCounter = EventCounter.EventCounter(self.TotName)
         self.HistManager  = HistManager.HistManager(self.TotName)
 
     #Getters and Setters
+    def setStore(self, store):
+        self.Store = store
+
     def setIsData(self, isData):
         self.isData = isData
 
     def getIsData(self):
         return self.isData
 
+    def setHistogramBackend(self, backend):
+        self.HistManager.setBackend(backend)
+
+    def setCutflowTiming(self, timing):
+        self.EventCounter.setTiming(timing)
+
     #Execution functions
     def doInitialization(self):
+        self.EventCounter.registerCuts(["all"] + self.Cuts + ["final"])
         self.initialize()
       
     def initialize(self):
         pass
         
     def doAnalysis(self):
+        self.EventCounter.startTimer()
         eventinfo = self.Store.getEventInfo()
         weight = eventinfo.scalefactor()*eventinfo.eventWeight() if not self.getIsData() else 1
         self.countEvent("all", weight)
-        if self.analyze():
+        passed = self.analyze()
+        self.EventCounter.stopTimer()
+        if passed:
             self.countEvent("final", weight)
         
     def analyze(self):
         return True
+
+    def hasBatchAnalysis(self):
+        return self.analyzeBatch.__code__ is not Analysis.analyzeBatch.__code__
+
+    def doBatchAnalysis(self, chunk):
+        self.EventCounter.startTimer()
+        weights = self.getBatchWeights(chunk)
+        self.countEvents("all", weights)
+        selected = self.analyzeBatch(chunk, weights)
+        self.EventCounter.stopTimer()
+        self.countEvents("final", weights, selected)
+
+    def analyzeBatch(self, chunk, weights):
+        """Columnar counterpart of analyze. Receives a chunk of events and their weights and returns a boolean
+        mask of the events passing the selection. Analyses that do not override it are run event by event.
+        """
+        return numpy.ones(len(chunk), dtype=bool)
+
+    def getBatchWeights(self, chunk):
+        if self.getIsData():
+            return numpy.ones(len(chunk))
+        scalefactor = chunk["scaleFactor_ELE"]*chunk["scaleFactor_MUON"]*chunk["scaleFactor_TRIGGER"]
+        eventWeight = chunk["mcWeight"]*chunk["scaleFactor_PILEUP"]
+        return scalefactor*eventWeight
     
     def doFinalization(self):
         self.HistManager.writeHistograms()
+        self.EventCounter.writeResults()
         self.EventCounter.printResults()
         self.finalize()
 
@@ -65,6 +107,23 @@ class Analysis(object):
 
     def getHistogram(self, histName):
         return self.HistManager.getHistogram(histName)
+
+    def declareHistogram(self, histName, quantity, collection = None, stage = "final", histogram = None):
+        return self.HistManager.declareHistogram(stage, histName, quantity, collection, histogram)
+
+    def declareHistograms(self, prefix, histograms, collection, stage = "final"):
+        """Declares the histograms prefix_suffix for the (suffix, quantity) pairs, e.g. of AH.LeptonHistograms."""
+        return [self.declareHistogram(prefix + "_" + suffix, quantity, collection, stage) for suffix, quantity in histograms]
+
+    def fillStage(self, stage, weight, **values):
+        self.HistManager.fillStage(stage, weight, values)
   
     def countEvent(self, cut, weight):
         self.EventCounter.update(cut, weight)
+
+    def fillBatch(self, histogram, values, weights):
+        if len(values) == 0: return
+        histogram.FillN(len(values), numpy.ascontiguousarray(values, dtype=numpy.float64), numpy.ascontiguousarray(weights, dtype=numpy.float64))
+
+    def countEvents(self, cut, weights, mask = None):
+        self.EventCounter.updateBatch(cut, weights, mask)
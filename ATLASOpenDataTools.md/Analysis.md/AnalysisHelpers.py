@@ -1,13 +1,36 @@
 import ROOT
 import math
+import numpy
+
+import Kinematics
 
 """These helper functions implement three commonly used functionalities:
 The Object Selection Helpers represent standard object selections that serve as a starting point for
 self defined object selection strategies.
 The selectAndSortContainer function can be used to do selecting and sorting in a one liner.
 The StandardEventCuts function implements three standard cuts used in essentially all analyses.
+For the columnar execution mode each of these has a vectorized counterpart working on a whole chunk of events,
+which returns boolean masks over the flat lep_*/jet_* arrays (or over the events) instead of single decisions.
+The Shared Selection Helpers evaluate the standard selections at most once per event (or chunk) for all analyses
+running together, the results are memoized keyed on the selection function and must not be modified.
+The Branch Lists name the tuple branches read by the standard selections, analyses can combine them to declare
+their RequiredBranches. The Histogram Lists name the standard histograms of a lepton or jet collection by their
+suffix (lep_pt, leadlep_pt, ...) together with the accessor they show, to be declared via declareHistograms.
 """
 
+# Branch Lists
+StandardEventBranches = ["trigE", "trigM", "passGRL", "hasGoodVertex", "mcWeight",
+                         "scaleFactor_PILEUP", "scaleFactor_ELE", "scaleFactor_MUON", "scaleFactor_TRIGGER"]
+GoodLeptonBranches    = ["lep_n", "lep_pt", "lep_eta", "lep_phi", "lep_E", "lep_type", "lep_charge",
+                         "lep_isTight", "lep_ptcone30", "lep_etcone20"]
+GoodJetBranches       = ["alljet_n", "jet_pt", "jet_eta", "jet_phi", "jet_E", "jet_jvt"]
+EtMissBranches        = ["met_et", "met_phi"]
+
+# Histogram Lists
+LeptonHistograms = [("pt", "pt"), ("eta", "eta"), ("E", "e"), ("phi", "phi"), ("charge", "charge"), ("type", "pdgId"),
+                    ("ptconerel30", "isoptconerel30"), ("etconerel20", "isoetconerel20"), ("z0", "z0"), ("d0", "d0")]
+JetHistograms    = [("pt", "pt"), ("m", "m"), ("jvt", "jvt"), ("eta", "eta"), ("MV2c10", "mv2c10"), ("phi", "phi")]
+
 
 # Object Selection Helpers
 def isGoodLepton(Lepton):
@@ -35,61 +58,163 @@ def isGoodJet(jet):
     if jet.pt() < 50 and abs(jet.eta()) < 2.4 and jet.jvt() < 0.5: return False
     return True
 
+# Vectorized Object Selection Helpers
+def goodLeptonMask(chunk):
+    pdgId = numpy.abs(chunk["lep_type"])
+    return ((pdgId == 11) & goodElectronMask(chunk)) | ((pdgId == 13) & goodMuonMask(chunk))
+
+def goodElectronMask(chunk):
+    pt = chunk["lep_pt"]
+    mask = chunk["lep_isTight"] != 0
+    mask &= pt*0.001 > 25
+    mask &= chunk["lep_etcone20"]/pt < 0.15
+    mask &= chunk["lep_ptcone30"]/pt < 0.15
+    return mask
+
+def goodMuonMask(chunk):
+    pt = chunk["lep_pt"]
+    mask = chunk["lep_isTight"] != 0
+    mask &= pt*0.001 > 25
+    mask &= chunk["lep_etcone20"]/pt < 0.15
+    mask &= chunk["lep_ptcone30"]/pt < 0.15
+    return mask
+
+def goodJetMask(chunk):
+    pt     = chunk["jet_pt"]*0.001
+    abseta = numpy.abs(chunk["jet_eta"])
+    mask = pt >= 25
+    mask &= abseta <= 2.5
+    mask &= ~((pt < 50) & (abseta < 2.4) & (chunk["jet_jvt"] < 0.5))
+    return mask
+
 # Utility function
 def selectAndSortContainer(container, selectingFunction, sortingFunction):
     selectedContainer = [particle for particle in container if selectingFunction(particle)]
     return sorted(selectedContainer, key=sortingFunction, reverse=True)
 
+def sortByPt(particle):
+    return particle.pt()
+
+def selectAndSortJagged(offsets, mask, sortingValues):
+    """Vectorized selectAndSortContainer: returns the flat indices of the selected objects, ordered by event and
+    by decreasing sortingValues within each event, together with the offsets of the selected objects per event.
+    """
+    nevents = len(offsets) - 1
+    event = numpy.repeat(numpy.arange(nevents), numpy.diff(offsets))
+    selected = numpy.flatnonzero(mask)
+    order = numpy.lexsort((-sortingValues[selected], event[selected]))
+    selectedOffsets = numpy.zeros(nevents + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(event[selected], minlength=nevents), out=selectedOffsets[1:])
+    return selected[order], selectedOffsets
+
 # Event Selection Helpers
 def StandardEventCuts(eventinfo):
     if not (eventinfo.triggeredByElectron() or eventinfo.triggeredByMuon()): return False
     if not eventinfo.passGRL(): return False
     if not eventinfo.hasGoodVertex(): return False
     return True;
+
+# Preselections used for skimming, they take the Store and decide whether an event is kept
+def StandardPreselection(store):
+    return passStandardEventCuts(store)
+
+def SingleLeptonPreselection(store):
+    if not StandardPreselection(store): return False
+    if not store.getEtMiss().et() > 30: return False
+    return len(getGoodLeptons(store)) == 1
+
+def StandardEventCutsMask(chunk):
+    mask = (chunk["trigE"] != 0) | (chunk["trigM"] != 0)
+    mask &= chunk["passGRL"] != 0
+    mask &= chunk["hasGoodVertex"] != 0
+    return mask
+
+# Shared Selection Helpers
+def passStandardEventCuts(store):
+    return store.memoize(("StandardEventCuts",), StandardEventCuts, store.getEventInfo())
+
+def getGoodLeptons(store, selectingFunction = isGoodLepton):
+    """Selected leptons sorted by decreasing pt."""
+    return store.memoize(("goodLeptons", selectingFunction), selectAndSortContainer, store.getLeptons(), selectingFunction, sortByPt)
+
+def getGoodJets(store, selectingFunction = isGoodJet):
+    """Selected jets sorted by decreasing pt."""
+    return store.memoize(("goodJets", selectingFunction), selectAndSortContainer, store.getJets(), selectingFunction, sortByPt)
+
+def getStandardEventCutsMask(chunk):
+    return chunk.memoize(("StandardEventCuts",), StandardEventCutsMask, chunk)
+
+def getGoodLeptonsJagged(chunk, maskFunction = goodLeptonMask):
+    """Flat indices and offsets of the selected leptons sorted by decreasing pt, see selectAndSortJagged."""
+    return chunk.memoize(("goodLeptons", maskFunction),
+                         lambda: selectAndSortJagged(chunk.offsets("lep_pt"), maskFunction(chunk), chunk["lep_pt"]))
+
+def getGoodJetsJagged(chunk, maskFunction = goodJetMask):
+    """Flat indices and offsets of the selected jets sorted by decreasing pt, see selectAndSortJagged."""
+    return chunk.memoize(("goodJets", maskFunction),
+                         lambda: selectAndSortJagged(chunk.offsets("jet_pt"), maskFunction(chunk), chunk["jet_pt"]))
     
     
 # Variable Definitions:
 def WTransverseMass(lepton, etmiss):
-    return math.sqrt(2*lepton.pt()*etmiss.et()*(1-math.cos(lepton.tlv().DeltaPhi(etmiss.tlv()))));
+    return Kinematics.transverseMassScalar(lepton.pt(), lepton.phi(), etmiss.et(), etmiss.phi())
 
 
 # Reconstructed top mass single top events t-channel:
-def SingleTopMassSebas(lepton, etmiss, bjet):
-    WMass = 80.4
-    alpha = 0.5*(math.pow(WMass,2)-math.pow(lepton.tlv().M(),2))
-    beta = lepton.tlv().Px() * math.cos(etmiss.phi()) + lepton.tlv().Py() * math.sin(etmiss.phi())
-    mu = alpha + beta*etmiss.et()
-    b = (2*mu*lepton.tlv().Pz())/(math.pow(lepton.tlv().E(),2)-math.pow(lepton.tlv().Pz(),2))
-    c = ((math.pow(lepton.tlv().E(),2)*math.pow(etmiss.et(),2)) - mu*mu)/(math.pow(lepton.tlv().E(),2)-math.pow(lepton.tlv().Pz(),2))
+# The longitudinal momentum of the neutrino is fixed by requiring the lepton and the missing transverse momentum to
+# form a W boson. Of the two solutions of the quadratic equation the one with smaller |pz| is chosen, if there is
+# no real solution pz is set to zero.
+def NeutrinoPzScalar(leptonP4, metEt, metPhi, WMass = 80.4):
+    leptonM = leptonP4.m()
+    alpha = 0.5*(WMass*WMass - leptonM*leptonM)
+    beta = leptonP4.Px * math.cos(metPhi) + leptonP4.Py * math.sin(metPhi)
+    mu = alpha + beta*metEt
+    denominator = leptonP4.E*leptonP4.E - leptonP4.Pz*leptonP4.Pz
+    b = (2*mu*leptonP4.Pz)/denominator
+    c = ((leptonP4.E*leptonP4.E)*(metEt*metEt) - mu*mu)/denominator
     Delta = (b*b)-(4*c)
 
-    mtop = 0
-    pzneu = 0
-    pzneu1 = 0
-    pzneu2 = 0
-    eneu=0
-
-    if Delta == 0 :
-        pzneu = -b/2
-    elif Delta > 0:
+    if Delta == 0:
+        return -b/2
+    if Delta > 0:
         pzneu1 = (-b+math.sqrt(Delta))/2
         pzneu2 = (-b-math.sqrt(Delta))/2
-        if abs(pzneu1)<abs(pzneu2):
-            pzneu=pzneu1
-        else:
-            pzneu=pzneu2
-    else:
-        Delta=0
-
-    pneutrino = ROOT.TLorentzVector()
-
-
-    eneu = math.sqrt(math.pow(etmiss.tlv().Px(),2)+math.pow(etmiss.tlv().Py(),2)+math.pow(pzneu,2))
-    pneutrino.SetPxPyPzE(etmiss.tlv().Px(),etmiss.tlv().Py(),pzneu,eneu)
-    mtop=(pneutrino+lepton.tlv()+bjet.tlv()).M()
+        return pzneu1 if abs(pzneu1)<abs(pzneu2) else pzneu2
+    return 0
 
+def SingleTopMassSebas(lepton, etmiss, bjet):
+    leptonP4 = lepton.p4()
+    metEt, metPhi = etmiss.et(), etmiss.phi()
+    pxneu, pyneu = metEt*math.cos(metPhi), metEt*math.sin(metPhi)
+    pzneu = NeutrinoPzScalar(leptonP4, metEt, metPhi)
+    eneu = math.sqrt(pxneu*pxneu + pyneu*pyneu + pzneu*pzneu)
+    pneutrino = Kinematics.FourMomentum(pxneu, pyneu, pzneu, eneu)
+    return (pneutrino+leptonP4+bjet.p4()).m()
+
+# Vectorized top mass reconstruction, leptons and b-jets are given as (px, py, pz, e) tuples of arrays
+def NeutrinoPz(lepton, metEt, metPhi, WMass = 80.4):
+    px, py, pz, e = lepton
+    leptonM = Kinematics.invariantMass(lepton)
+    alpha = 0.5*(WMass*WMass - leptonM*leptonM)
+    beta = px*numpy.cos(metPhi) + py*numpy.sin(metPhi)
+    mu = alpha + beta*metEt
+    denominator = e*e - pz*pz
+    b = (2*mu*pz)/denominator
+    c = ((e*e)*(metEt*metEt) - mu*mu)/denominator
+    Delta = (b*b)-(4*c)
 
-    return mtop; 
+    root = numpy.sqrt(numpy.maximum(Delta, 0))
+    pzneu1 = (-b+root)/2
+    pzneu2 = (-b-root)/2
+    pzneu = numpy.where(numpy.abs(pzneu1) < numpy.abs(pzneu2), pzneu1, pzneu2)
+    pzneu = numpy.where(Delta == 0, -b/2, pzneu)
+    return numpy.where(Delta >= 0, pzneu, 0.0)
+
+def SingleTopMass(lepton, metEt, metPhi, bjet):
+    pxneu, pyneu = metEt*numpy.cos(metPhi), metEt*numpy.sin(metPhi)
+    pzneu = NeutrinoPz(lepton, metEt, metPhi)
+    eneu = numpy.sqrt(pxneu*pxneu + pyneu*pyneu + pzneu*pzneu)
+    return Kinematics.invariantMass(Kinematics.sumMomenta((pxneu, pyneu, pzneu, eneu), lepton, bjet))
 
     
 
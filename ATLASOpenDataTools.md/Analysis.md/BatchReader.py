@@ -0,0 +1,112 @@
+import numpy
+
+#======================================================================
+
+class Chunk(object):
+    """A chunk holds a range of consecutive entries of the input tree in columnar form.
+    Event based branches are stored as one NumPy array with one value per event. Object based branches
+    (lep_*, jet_*) are stored as flat arrays together with the offsets of their counter branch, so that the
+    objects belonging to event i are found in flat[offsets[i]:offsets[i+1]].
+    """
+    def __init__(self, first, last):
+        super(Chunk, self).__init__()
+        self.First    = first
+        self.Last     = last
+        self.Arrays   = {}
+        self.Counters = {}
+        self.Offsets  = {}
+        self.Memo     = {}
+
+    def __len__(self):
+        return self.Last - self.First
+
+    def __getitem__(self, branchname):
+        return self.Arrays[branchname]
+
+    def __contains__(self, branchname):
+        return branchname in self.Arrays
+
+    def memoize(self, key, function, *args):
+        """Returns function(*args), which is computed at most once per chunk for a given key."""
+        if key not in self.Memo:
+            self.Memo[key] = function(*args)
+        return self.Memo[key]
+
+    def offsets(self, branchname):
+        return self.Offsets[self.Counters.get(branchname, branchname)]
+
+    def counts(self, branchname):
+        return numpy.diff(self.offsets(branchname))
+
+    def eventIndex(self, branchname):
+        """Returns for every entry of the flat array of branchname the index of the event it belongs to."""
+        counts = self.counts(branchname)
+        return numpy.repeat(numpy.arange(len(counts)), counts)
+
+#======================================================================
+
+class BatchReader(object):
+    """The BatchReader reads the activated branches of the input tree in chunks of consecutive entries.
+    The readout is done via TTree::Draw in graphics-off mode, which loops over the entries in compiled code
+    and leaves the values in the buffers returned by GetV1...GetV4. These buffers are converted to NumPy
+    arrays, so no python code is executed per event. Floating point branches are kept in double precision,
+    which is the precision the per event code sees as well.
+    """
+    MaxVariablesPerDraw = 4
+
+    def __init__(self, tree, branches, chunkSize):
+        super(BatchReader, self).__init__()
+        self.Tree      = tree
+        self.ChunkSize = chunkSize
+
+        # branches are given as (branchname, vartype, counter) tuples as recorded by the TupleReader
+        self.Types   = dict((name, vartype) for name, vartype, counter in branches)
+        self.Scalars = [name for name, vartype, counter in branches if counter is None]
+        self.Jagged  = {}
+        for name, vartype, counter in branches:
+            if counter is not None:
+                self.Jagged.setdefault(counter, []).append(name)
+
+    def chunks(self, first, last):
+        for start in xrange(first, last, self.ChunkSize):
+            yield self.readChunk(start, min(start + self.ChunkSize, last))
+
+    def readChunk(self, first, last):
+        chunk = Chunk(first, last)
+        nevents = last - first
+        self.readBranches(chunk, self.Scalars, nevents, first, nevents)
+
+        for counter, names in self.Jagged.items():
+            counts = chunk[counter].astype(numpy.int64)
+            offsets = numpy.zeros(nevents + 1, dtype=numpy.int64)
+            numpy.cumsum(counts, out=offsets[1:])
+            chunk.Offsets[counter] = offsets
+            for name in names:
+                chunk.Counters[name] = counter
+            self.readBranches(chunk, names, nevents, first, int(offsets[-1]))
+        return chunk
+
+    # Helper functions
+    def readBranches(self, chunk, names, nevents, first, nrows):
+        self.Tree.SetEstimate(max(nrows, 1) + 1)
+        for i in xrange(0, len(names), self.MaxVariablesPerDraw):
+            group = names[i:i + self.MaxVariablesPerDraw]
+            nselected = self.Tree.Draw(":".join(group), "", "goff", nevents, first) if nrows > 0 else 0
+            values = [self.fetch(self.getBuffer(j), nselected) for j in range(len(group))]
+            for name, value in zip(group, values):
+                chunk.Arrays[name] = value.astype(self.getDType(self.Types[name]))
+
+    def getDType(self, vartype):
+        return numpy.float64 if vartype in "fd" else numpy.dtype(vartype)
+
+    def getBuffer(self, j):
+        return (self.Tree.GetV1, self.Tree.GetV2, self.Tree.GetV3, self.Tree.GetV4)[j]()
+
+    def fetch(self, buffer, nrows):
+        if nrows <= 0:
+            return numpy.zeros(0)
+        if hasattr(buffer, "reshape"):
+            buffer.reshape((nrows,))
+        else:
+            buffer.SetSize(nrows)
+        return numpy.frombuffer(buffer, dtype=numpy.float64, count=nrows)
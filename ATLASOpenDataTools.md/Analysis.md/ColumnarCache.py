@@ -0,0 +1,211 @@
+import json
+import numpy
+import os
+import time
+
+import BatchReader
+
+#======================================================================
+
+class ColumnarCache(object):
+    """On-disk columnar copy of the branches read by the TupleReader for the input files of one process.
+    Every branch is stored as a flat binary file with one value per event (event based branches) or one value per
+    object (lep_*, jet_*). The offsets of the objects of each event are stored per counter branch, so that the
+    objects of event i are found in flat[offsets[i]:offsets[i+1]]. All files are memory mapped when reading, so no
+    ROOT deserialization is needed and only the pages that are accessed are loaded.
+    The manifest records size and modification time of the source files in the order they were chained, a cache is
+    only used while they match in the same order, so that entry numbers refer to the same events as in the input chain.
+    """
+    ManifestName = "manifest.json"
+
+    def __init__(self, directory):
+        super(ColumnarCache, self).__init__()
+        self.Directory = directory
+        self.Manifest  = None
+        self.Arrays    = {}
+
+    # Reading
+    def isValid(self, inputFiles):
+        manifest = self.readManifest()
+        if manifest is None:
+            return False
+        return manifest["sources"] == [self.getSource(filename) for filename in inputFiles]
+
+    def getEntries(self):
+        return self.readManifest()["entries"]
+
+    def getBranches(self):
+        """Returns the cached branches as (branchname, vartype, counter) tuples as recorded by the TupleReader."""
+        branches = self.readManifest()["branches"]
+        return [(name, branches[name]["type"], branches[name]["counter"]) for name in sorted(branches)]
+
+    def getArray(self, branchname):
+        if branchname not in self.Arrays:
+            branch = self.readManifest()["branches"][branchname]
+            self.Arrays[branchname] = self.mapFile(branchname, branch["dtype"], branch["length"])
+        return self.Arrays[branchname]
+
+    def getOffsets(self, counter):
+        key = counter + ".offsets"
+        if key not in self.Arrays:
+            self.Arrays[key] = self.mapFile(key, "int64", self.getEntries() + 1)
+        return self.Arrays[key]
+
+    def readChunk(self, first, last, branches):
+        """Returns the entries [first, last) of the given branches as a Chunk of views into the mapped files."""
+        chunk = BatchReader.Chunk(first, last)
+        for name, vartype, counter in branches:
+          if counter is None:
+            chunk.Arrays[name] = self.getArray(name)[first:last]
+          else:
+            offsets = self.getOffsets(counter)[first:last + 1]
+            chunk.Arrays[name] = self.getArray(name)[offsets[0]:offsets[-1]]
+            chunk.Counters[name] = counter
+            if counter not in chunk.Offsets:
+              chunk.Offsets[counter] = offsets - offsets[0]
+        return chunk
+
+    # Writing
+    def write(self, tree, branches, inputFiles, chunkSize = 100000):
+        """Converts the given (branchname, vartype, counter) branches of the tree chunk by chunk."""
+        if not os.path.exists(self.Directory):
+          os.makedirs(self.Directory)
+        self.Manifest = None
+        self.Arrays   = {}
+        nentries = int(tree.GetEntries())
+        reader   = BatchReader.BatchReader(tree, branches, chunkSize)
+        counters = set([counter for name, vartype, counter in branches if counter is not None])
+        files    = dict((name, open(self.getFileName(name), "wb")) for name, vartype, counter in branches)
+        files.update((counter + ".offsets", open(self.getFileName(counter + ".offsets"), "wb")) for counter in counters)
+        lengths  = dict((name, 0) for name in files)
+        for counter in counters:
+          numpy.zeros(1, dtype=numpy.int64).tofile(files[counter + ".offsets"])
+
+        for chunk in reader.chunks(0, nentries):
+          self.log("Converting entries %d to %d" % (chunk.First, chunk.Last))
+          for name, vartype, counter in branches:
+            chunk[name].tofile(files[name])
+            lengths[name] += len(chunk[name])
+          for counter in counters:
+            # offsets are stored relative to the first entry of the whole tree
+            (chunk.Offsets[counter][1:] + lengths[counter + ".offsets"]).tofile(files[counter + ".offsets"])
+            lengths[counter + ".offsets"] += int(chunk.Offsets[counter][-1])
+        for cachefile in files.values():
+          cachefile.close()
+
+        manifest = {"entries"  : nentries,
+                    "sources"  : [self.getSource(filename) for filename in inputFiles],
+                    "branches" : dict((name, {"type" : vartype, "counter" : counter, "length" : lengths[name],
+                                              "dtype" : numpy.dtype(reader.getDType(vartype)).name})
+                                      for name, vartype, counter in branches)}
+        temporary = "%s.%d.tmp" % (self.getFileName(self.ManifestName), os.getpid())
+        with open(temporary, "w") as manifestfile:
+          json.dump(manifest, manifestfile, indent=1, sort_keys=True)
+        os.rename(temporary, os.path.join(self.Directory, self.ManifestName))
+        self.log("Converted %d entries of %d branches into %s" % (nentries, len(branches), self.Directory))
+
+    # Helper functions
+    def readManifest(self):
+        if self.Manifest is None:
+          filename = os.path.join(self.Directory, self.ManifestName)
+          if not os.path.exists(filename):
+            return None
+          try:
+            with open(filename) as manifestfile:
+              self.Manifest = json.load(manifestfile)
+          except ValueError:
+            self.log("Manifest " + filename + " is corrupted, ignoring the cache")
+            return None
+        return self.Manifest
+
+    def getSource(self, filename):
+        stat = os.stat(filename)
+        return [os.path.abspath(filename), stat.st_size, stat.st_mtime]
+
+    def getFileName(self, name):
+        return os.path.join(self.Directory, name)
+
+    def mapFile(self, name, dtype, length):
+        # empty files can not be mapped
+        if length == 0:
+          return numpy.zeros(0, dtype=dtype)
+        return numpy.memmap(self.getFileName(name), dtype=dtype, mode="r", shape=(length,))
+
+    def log(self, message):
+        print time.ctime() + " ColumnarCache: " + message
+
+#======================================================================
+
+class ColumnarReader(object):
+    """Reads chunks of consecutive entries from a ColumnarCache, with the same interface as the BatchReader."""
+    def __init__(self, cache, branches, chunkSize):
+        super(ColumnarReader, self).__init__()
+        self.Cache     = cache
+        self.Branches  = branches
+        self.ChunkSize = chunkSize
+
+    def chunks(self, first, last):
+        for start in xrange(first, last, self.ChunkSize):
+            yield self.readChunk(start, min(start + self.ChunkSize, last))
+
+    def readChunk(self, first, last):
+        return self.Cache.readChunk(first, last, self.Branches)
+
+#======================================================================
+
+class ColumnarTree(object):
+    """Stand-in for the input TChain reading from a ColumnarCache. It implements the part of the TTree interface
+    used by the TupleReader: branches are activated via SetBranchStatus, bound via SetBranchAddress and GetEntry
+    copies the values of an entry from the mapped files into the bound buffers.
+    """
+    def __init__(self, cache):
+        super(ColumnarTree, self).__init__()
+        self.Cache     = cache
+        self.Types     = dict((name, vartype) for name, vartype, counter in cache.getBranches())
+        self.Counters  = dict((name, counter) for name, vartype, counter in cache.getBranches())
+        self.Status    = dict((name, True) for name in self.Types)
+        self.Addresses = {}
+        self.Active    = []
+        self.ReadEntry = -1
+
+    def SetBranchStatus(self, branchname, status):
+        if branchname == "*":
+          self.Status = dict((name, bool(status)) for name in self.Types)
+        elif branchname in self.Types:
+          self.Status[branchname] = bool(status)
+        self.updateActive()
+
+    def SetBranchAddress(self, branchname, buffer):
+        if branchname not in self.Types:
+          raise KeyError("Branch " + branchname + " is not in the columnar cache " + self.Cache.Directory)
+        # a view on the buffer, so assigning to it fills the datamember of the TupleReader
+        self.Addresses[branchname] = numpy.frombuffer(buffer, dtype=numpy.dtype(self.Types[branchname]))
+        self.updateActive()
+
+    def GetEntries(self):
+        return self.Cache.getEntries()
+
+    def GetReadEntry(self):
+        return self.ReadEntry
+
+    def GetMaximum(self, branchname):
+        values = self.Cache.getArray(branchname)
+        return values.max() if len(values) > 0 else 0
+
+    def GetEntry(self, entry):
+        for values, counter, address in self.Active:
+          if counter is None:
+            address[0] = values[entry]
+          else:
+            first, last = counter[entry], counter[entry + 1]
+            last = min(last, first + len(address))
+            address[:last - first] = values[first:last]
+        self.ReadEntry = entry
+        return 1
+
+    # Helper functions
+    def updateActive(self):
+        self.Active = [(self.Cache.getArray(name),
+                        self.Cache.getOffsets(self.Counters[name]) if self.Counters[name] is not None else None,
+                        address)
+                       for name, address in self.Addresses.items() if self.Status[name]]
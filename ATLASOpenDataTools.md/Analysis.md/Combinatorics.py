@@ -0,0 +1,103 @@
+import itertools
+import math
+import numpy
+
+"""Helpers for the search of the best combination of physics objects in an event.
+Instead of looping over all combinations and adding four-vectors for each of them, the momenta of the objects are
+converted once into NumPy arrays and all combinations are evaluated at once by indexing these arrays with a table
+of the index combinations. The tables only depend on the number of objects and are cached. Creating the arrays costs
+more than looping over the few combinations of a typical event, so the arrays are only used from
+MinVectorizedObjects objects on.
+The pairing helpers build the table of the distinct lepton pairs and their masses once, so that the search for
+Z boson candidates does not loop over all permutations of the leptons.
+Ties are resolved like in a loop over itertools.combinations or permutations with a strict comparison: the first
+combination wins.
+"""
+
+_CombinationTables = {}
+
+# below this number of objects looping over the combinations is faster than building the arrays
+MinVectorizedObjects = 8
+
+def combinationTable(n, size):
+    """Returns an array of shape (number of combinations, size) holding all index combinations in lexicographic order."""
+    key = (n, size)
+    if key not in _CombinationTables:
+        combinations = list(itertools.combinations(range(n), size))
+        _CombinationTables[key] = numpy.array(combinations, dtype=numpy.int64).reshape(len(combinations), size)
+    return _CombinationTables[key]
+
+def momentumArrays(particles):
+    """Returns the four-momenta of the particles as a (px, py, pz, e) tuple of arrays."""
+    momenta = [particle.p4() for particle in particles]
+    return (numpy.array([p.Px for p in momenta]), numpy.array([p.Py for p in momenta]),
+            numpy.array([p.Pz for p in momenta]), numpy.array([p.E for p in momenta]))
+
+def sumCombinations(values, table):
+    """Sums values over every combination of the table, adding the entries in the same order as a loop would."""
+    result = values[table[:, 0]]
+    for column in range(1, table.shape[1]):
+        result = result + values[table[:, column]]
+    return result
+
+def highestPtCombination(particles, size):
+    """Returns the indices of the combination of size particles with the largest transverse momentum of their sum,
+    None if there are less than size particles.
+    """
+    if len(particles) < size:
+        return None
+    if len(particles) < MinVectorizedObjects:
+        return highestPtCombinationLoop([particle.p4() for particle in particles], size)
+    px, py = momentumArrays(particles)[:2]
+    table = combinationTable(len(px), size)
+    sumPx = sumCombinations(px, table)
+    sumPy = sumCombinations(py, table)
+    best = numpy.argmax(numpy.sqrt(sumPx*sumPx + sumPy*sumPy))
+    return tuple(int(index) for index in table[best])
+
+def highestPtCombinationLoop(momenta, size):
+    # same sums and comparisons as the vectorized version, so both return the same combination
+    best, bestPt = None, None
+    for combination in itertools.combinations(range(len(momenta)), size):
+        px, py = momenta[combination[0]].Px, momenta[combination[0]].Py
+        for index in combination[1:]:
+            px, py = px + momenta[index].Px, py + momenta[index].Py
+        pt = math.sqrt(px*px + py*py)
+        if best is None or pt > bestPt:
+            best, bestPt = combination, pt
+    return best
+
+# Pairing
+def oppositeSignSameFlavourPairs(leptons):
+    """Returns the index pairs (i, j) with i < j of all opposite-sign same-flavour leptons in lexicographic order."""
+    charges = [lepton.charge() for lepton in leptons]
+    flavours = [abs(lepton.pdgId()) for lepton in leptons]
+    return [(i, j) for i, j in itertools.combinations(range(len(leptons)), 2)
+            if charges[i]*charges[j] <= 0 and flavours[i] == flavours[j]]
+
+def pairWindows(particles, pairs, mass):
+    """Returns for every pair the distance of the invariant mass of its two particles to mass."""
+    momenta = [particle.p4() for particle in particles]
+    return [abs((momenta[i] + momenta[j]).m() - mass) for i, j in pairs]
+
+def bestPair(pairs, windows):
+    """Returns the pair with the smallest window, None if there is no pair."""
+    best = None
+    for n in range(len(pairs)):
+        if best is None or windows[n] < windows[best]:
+            best = n
+    return pairs[best] if best is not None else None
+
+def bestDisjointPairs(pairs, windows):
+    """Returns the two pairs without a common particle with the smallest sum of windows, None if there are none.
+    Every assignment is only visited once, the pair with the lower indices is returned first.
+    """
+    best, bestWindow = None, None
+    for n in range(len(pairs)):
+        for m in range(n + 1, len(pairs)):
+            if pairs[m][0] in pairs[n] or pairs[m][1] in pairs[n]:
+                continue
+            window = windows[n] + windows[m]
+            if best is None or window < bestWindow:
+                best, bestWindow = (pairs[n], pairs[m]), window
+    return best
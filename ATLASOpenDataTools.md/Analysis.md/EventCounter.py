@@ -1,29 +1,161 @@
 import ROOT
-import collections
+import numpy
 import time
 
 #======================================================================
 
 class EventCounter(object):
-    """Event counting faclility for the analysis class."""
-    def __init__(self, name):
+    """Event counting faclility for the analysis class.
+    Cuts are registered in the order of the selection and get consecutive ids. The number of events, the sum of
+    weights and the sum of squared weights passing every cut are kept in arrays indexed by the cut id, which can be
+    updated event by event or for a whole chunk of events at once. Optionally the wall time spent between a cut and
+    the previous one is accounted to the cut, which shows the selection steps that dominate the processing time.
+    The counts are written to the output file as labelled histograms (raw, weighted and, if timed, the time) so that
+    the cutflow of partial outputs can be read back and merged.
+    """
+    RawHistogramName      = "cutflow_raw"
+    WeightedHistogramName = "cutflow_weighted"
+    TimeHistogramName     = "cutflow_time"
+    HistogramNames        = (RawHistogramName, WeightedHistogramName, TimeHistogramName)
+
+    def __init__(self, name, capacity = 16):
         super(EventCounter, self).__init__()
-        self.Name = name
-        self.RawCounter      = collections.Counter()
-        self.WeightedCounter = collections.Counter()
-    
+        self.Name   = name
+        self.Cuts   = []
+        self.CutIds = {}
+        self.Raw    = numpy.zeros(capacity, dtype=numpy.int64)
+        self.SumW   = numpy.zeros(capacity)
+        self.SumW2  = numpy.zeros(capacity)
+        self.Time   = numpy.zeros(capacity)
+        self.Timing = False
+        self.LastTime  = None
+        self.LastCutId = None
+
+    # Cut registration
+    def registerCut(self, cut):
+        """Returns the id of cut, new cuts are appended to the cutflow."""
+        if cut in self.CutIds:
+            return self.CutIds[cut]
+        cutId = len(self.Cuts)
+        if cutId == len(self.Raw):
+            self.Raw, self.SumW, self.SumW2, self.Time = [numpy.concatenate([array, numpy.zeros_like(array)])
+                                                          for array in (self.Raw, self.SumW, self.SumW2, self.Time)]
+        self.Cuts.append(cut)
+        self.CutIds[cut] = cutId
+        return cutId
+
+    def registerCuts(self, cuts):
+        return [self.registerCut(cut) for cut in cuts]
+
+    def getCutId(self, cut):
+        """Returns the id of a cut given by name or id, cuts that were not registered yet are appended."""
+        if isinstance(cut, int):
+            return cut
+        cutId = self.CutIds.get(cut)
+        return cutId if cutId is not None else self.registerCut(cut)
+
+    def setTiming(self, timing):
+        self.Timing = timing
+
+    def startTimer(self):
+        """Marks the start of an event or chunk, the time until the first cut is accounted to this cut."""
+        if self.Timing:
+            self.LastTime  = time.time()
+            self.LastCutId = None
+
+    def stopTimer(self):
+        """Marks the end of the selection of an event or chunk. The time since the last counted cut is accounted to
+        the cut registered after it, which rejected the event if it failed, or to a "rejected" cut if there is none.
+        """
+        if not self.Timing or self.LastTime is None: return
+        cutId = self.LastCutId + 1 if self.LastCutId is not None else 0
+        if cutId >= len(self.Cuts):
+            cutId = self.registerCut("rejected")
+        self.Time[cutId] += time.time() - self.LastTime
+        self.LastTime  = None
+
+    # Utility function
+    def update(self, cut, weight):
+        cutId = self.getCutId(cut)
+        self.Raw[cutId]   += 1
+        self.SumW[cutId]  += weight
+        self.SumW2[cutId] += weight*weight
+        if self.Timing: self.updateTime(cutId)
+
+    def updateBatch(self, cut, weights, mask = None):
+        """Counts the events of a chunk with the given weights, only those selected by the boolean mask if given."""
+        cutId = self.getCutId(cut)
+        if mask is not None:
+            weights = weights[mask]
+        self.Raw[cutId]   += len(weights)
+        self.SumW[cutId]  += float(weights.sum())
+        self.SumW2[cutId] += float(numpy.dot(weights, weights))
+        if self.Timing: self.updateTime(cutId)
+
+    # Output
     def printResults(self):
-        self.log("+----------------------------------------------------------------+")
-        for item, value in self.RawCounter.most_common():
-            self.log("|%20s : %20i : %17.2f |" %(item, value, self.WeightedCounter[item]))
-        self.log("+----------------------------------------------------------------+")
-    
+        rows = []
+        for cutId, cut in enumerate(self.Cuts):
+            row = "|%20s : %12i : %17.2f +- %14.2f " % (cut, self.Raw[cutId], self.SumW[cutId], numpy.sqrt(self.SumW2[cutId]))
+            if self.Timing:
+                row += ": %10.2f s " % self.Time[cutId]
+            rows.append(row + "|")
+        # the border follows the width of the rows, which depends on the timing column
+        line = "+" + "-"*(max([len(row) for row in rows] + [2]) - 2) + "+"
+        self.log(line)
+        [self.log(row) for row in rows]
+        self.log(line)
+
+    def writeResults(self):
+        rawHistogram      = self.createHistogram(self.RawHistogramName, "Cutflow;;Events")
+        weightedHistogram = self.createHistogram(self.WeightedHistogramName, "Weighted Cutflow;;Weighted Events")
+        weightedHistogram.Sumw2()
+        for cutId in range(len(self.Cuts)):
+            rawHistogram.SetBinContent(cutId+1, self.Raw[cutId])
+            weightedHistogram.SetBinContent(cutId+1, self.SumW[cutId])
+            weightedHistogram.SetBinError(cutId+1, numpy.sqrt(self.SumW2[cutId]))
+        rawHistogram.Write()
+        weightedHistogram.Write()
+        if self.Timing:
+            timeHistogram = self.createHistogram(self.TimeHistogramName, "Cutflow Timing;;Time [s]")
+            for cutId in range(len(self.Cuts)):
+                timeHistogram.SetBinContent(cutId+1, self.Time[cutId])
+            timeHistogram.Write()
+
+    def readResults(self, tfile):
+        """Adds the counts stored in tfile by writeResults, returns False if the file holds no cutflow."""
+        rawHistogram      = tfile.Get(self.RawHistogramName)
+        weightedHistogram = tfile.Get(self.WeightedHistogramName)
+        timeHistogram     = tfile.Get(self.TimeHistogramName)
+        if not rawHistogram or not weightedHistogram: return False
+        # cutflows written without the squared weights only hold the sum of weights
+        hasSumW2 = weightedHistogram.GetSumw2N() > 0
+        for i in range(1, rawHistogram.GetNbinsX()+1):
+            cutId = self.registerCut(rawHistogram.GetXaxis().GetBinLabel(i))
+            self.Raw[cutId]  += int(round(rawHistogram.GetBinContent(i)))
+            self.SumW[cutId] += weightedHistogram.GetBinContent(i)
+            if hasSumW2:
+                self.SumW2[cutId] += weightedHistogram.GetBinError(i)**2
+            if timeHistogram:
+                self.Time[cutId] += timeHistogram.GetBinContent(i)
+        self.Timing = self.Timing or bool(timeHistogram)
+        return True
+
     def log(self, message):
         print time.ctime() + " EventStatistics " + self.Name + ": " + message
-        
-    # Utility function      
-    def update(self, cut, weight):
-        self.RawCounter.update([cut])
-        self.WeightedCounter[cut] += weight
-        
-        
\ No newline at end of file
+
+    # Helper functions
+    def updateTime(self, cutId):
+        # cuts counted after stopTimer, like the final cut, add no time
+        if self.LastTime is None: return
+        now = time.time()
+        self.Time[cutId] += now - self.LastTime
+        self.LastTime  = now
+        self.LastCutId = cutId
+
+    def createHistogram(self, name, title):
+        nbins = max(len(self.Cuts), 1)
+        histogram = ROOT.TH1D(name, title, nbins, 0, nbins)
+        for cutId, cut in enumerate(self.Cuts):
+            histogram.GetXaxis().SetBinLabel(cutId+1, cut)
+        return histogram
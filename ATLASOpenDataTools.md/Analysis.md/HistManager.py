@@ -1,21 +1,39 @@
 import ROOT
+import numpy
+import operator
 import time
+import NumpyHistogram
 import StandardHistograms as SH
 
 #======================================================================
 
 class HistManager(object):    
-    """Histogram managing tool for the analysis class."""
+    """Histogram managing tool for the analysis class. The histograms are handed out wrapped into a BufferedHistogram,
+    which collects the values of Fill calls and fills them into the ROOT histogram in bulk. With the NumPy backend
+    the histograms are kept as NumpyHistograms and only converted into ROOT histograms when they are written.
+    Histograms can also be declared together with the quantity they show and the stage of the selection at which
+    they are filled, fillStage then fills all histograms of a stage at once.
+    """
+    Backends = ("ROOT", "NumPy")
+
     def __init__(self, name):
         super(HistManager, self).__init__()
         # Configurable
         self.Name = name
+        self.Backend = "ROOT"
 
         self.Histograms = {}
+        # stage -> collection -> quantity -> [function computing the values, histograms]
+        self.Declarations = {}
+
+    def setBackend(self, backend):
+        if backend not in self.Backends:
+            self.log("Unknown histogram backend " + backend + ", using ROOT")
+            return
+        self.Backend = backend
 
 
     def getHistogram(self, histName):
-        return self.HistManager.getHistogram(histName)
         if histName in self.Histograms:
             return self.Histograms[histName]
         else:
@@ -26,20 +44,138 @@ class HistManager(object):
         if histName in self.Histograms:
             print "Histogram with name " + histName + " already defined!"
         else:
-            self.Histograms[histName] = histogram
-        return histogram
+            if self.Backend == "NumPy":
+                histogram = self.toNumpyHistogram(histogram)
+            self.Histograms[histName] = BufferedHistogram(histogram)
+        return self.Histograms[histName]
         
     def addStandardHistogram(self, histName):
-        histogram = SH.getStandardHistogram(histName)
-        if histogram is None: 
+        spec = SH.getSpec(histName)
+        if spec is None: 
             self.log("Histogram with name " + histName + " not found")
             return None
+        # the NumPy backend does not need a ROOT histogram as template
+        histogram = spec.createNumpyHistogram() if self.Backend == "NumPy" else spec.createTH1D()
         return self.addHistogram(histName, histogram)
 
+    def declareHistogram(self, stage, histName, quantity, collection = None, histogram = None):
+        """Books a histogram, the standard histogram histName if none is given, which is filled by fillStage.
+        With a collection, the quantity is filled for every object of the collection and is the name of an accessor
+        of the objects or a function of an object, len fills the number of objects. Without a collection the
+        quantity is the name of a value given to fillStage or a function of the dictionary of these values.
+        """
+        histogram = self.addStandardHistogram(histName) if histogram is None else self.addHistogram(histName, histogram)
+        if histogram is None:
+            return None
+        quantities = self.Declarations.setdefault(stage, {}).setdefault(collection, {})
+        if quantity not in quantities:
+            quantities[quantity] = [self.getValueFunction(quantity, collection), []]
+        # histograms showing the same quantity share its computation
+        quantities[quantity][1].append(histogram)
+        return histogram
+
+    def fillStage(self, stage, weight, values):
+        """Fills all histograms declared for the stage from the given dictionary of collections and values."""
+        for collection, quantities in self.Declarations.get(stage, {}).items():
+            objects = values if collection is None else values[collection]
+            if collection is not None and not isinstance(objects, (list, tuple)):
+                objects = [objects]
+            for function, histograms in quantities.values():
+                result = function(objects)
+                for histogram in histograms:
+                    histogram.fillValues(result, weight)
+
+    def flushHistograms(self):
+        [hist.flush() for hist in self.Histograms.values()]
+
     def writeHistograms(self):
+        self.flushHistograms()
         [hist.Write() for hist in self.Histograms.values()]
 
     # Utility function
+    def getValueFunction(self, quantity, collection):
+        """Returns a function mapping the objects of the collection (the values if there is none) to a list of values."""
+        if collection is None:
+            if callable(quantity):
+                return lambda values: [quantity(values)]
+            return lambda values: [values[quantity]]
+        if quantity is len:
+            return lambda objects: [len(objects)]
+        accessor = quantity if callable(quantity) else operator.methodcaller(quantity)
+        return lambda objects: [accessor(particle) for particle in objects]
+
+    def toNumpyHistogram(self, histogram):
+        if isinstance(histogram, NumpyHistogram.NumpyHistogram):
+            return histogram
+        if not NumpyHistogram.NumpyHistogram.isSupported(histogram):
+            self.log("Histogram " + histogram.GetName() + " has no fixed binning, keeping it as ROOT histogram")
+            return histogram
+        # the ROOT histogram is not written, so it must not stay attached to the output file
+        histogram.SetDirectory(0)
+        return NumpyHistogram.NumpyHistogram.fromTH1(histogram)
+
     def log(self, message):
         print time.ctime() + " HistManager " + self.Name + ": " + message
-        
+
+#======================================================================
+
+class BufferedHistogram(object):
+    """Wrapper around a ROOT histogram, which stores the values and weights of Fill calls in NumPy buffers and fills
+    them with a single FillN call when the buffer is full or the histogram is used otherwise. FillN adds the values
+    in the order they were filled, so the result is the same as for individual Fill calls but only costs one PyROOT
+    call per BufferSize values. All other attributes are forwarded to the ROOT histogram after flushing the buffer.
+    """
+    BufferSize = 4096
+
+    def __init__(self, histogram):
+        super(BufferedHistogram, self).__init__()
+        self.Histogram = histogram
+        self.Values    = numpy.empty(self.BufferSize, dtype=numpy.float64)
+        self.Weights   = numpy.empty(self.BufferSize, dtype=numpy.float64)
+        self.NValues   = 0
+
+    def Fill(self, value, weight = 1.):
+        self.Values[self.NValues]  = value
+        self.Weights[self.NValues] = weight
+        self.NValues += 1
+        if self.NValues == self.BufferSize:
+            self.flush()
+
+    def fillValues(self, values, weight = 1.):
+        """Fills a list of values with the same weight."""
+        n = len(values)
+        if self.NValues + n > self.BufferSize:
+            self.flush()
+            if n > self.BufferSize:
+                self.Histogram.FillN(n, numpy.asarray(values, dtype=numpy.float64), numpy.full(n, weight, dtype=numpy.float64))
+                return
+        self.Values[self.NValues:self.NValues + n]  = values
+        self.Weights[self.NValues:self.NValues + n] = weight
+        self.NValues += n
+        if self.NValues == self.BufferSize:
+            self.flush()
+
+    def FillN(self, n, values, weights):
+        self.flush()
+        self.Histogram.FillN(n, values, weights)
+
+    def flush(self):
+        if self.NValues == 0: return
+        self.Histogram.FillN(self.NValues, self.Values, self.Weights)
+        self.NValues = 0
+
+    def __getstate__(self):
+        # pending values are filled first, so the pickled histogram is complete
+        self.flush()
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __getattr__(self, name):
+        # only called for attributes not defined by the wrapper itself, special methods are not forwarded and
+        # nothing is forwarded before the histogram is set, e.g. while the wrapper is unpickled
+        if name.startswith("__") or "Histogram" not in self.__dict__:
+            raise AttributeError(name)
+        self.flush()
+        return getattr(self.Histogram, name)
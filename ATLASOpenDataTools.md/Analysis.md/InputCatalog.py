@@ -0,0 +1,83 @@
+import glob
+import json
+import os
+import time
+
+#======================================================================
+
+class InputCatalog(object):
+    """Sidecar catalog of the input locations of the processes (file names or glob patterns like Input/Data/data_*.root).
+    For every location the catalog records the matching files together with their sizes, so that the globs do not
+    have to be resolved and the files do not have to be stat'ed again when the jobs are set up. A record is trusted
+    as long as the modification time of the directory of the location is unchanged, which changes whenever a file is
+    added, removed or renamed there. Locations with wildcards in the directory part are always resolved again.
+    Like the MetadataCache the catalog is a json file shared between runs and workers, which is saved atomically.
+    """
+    def __init__(self, filename):
+        super(InputCatalog, self).__init__()
+        self.FileName = filename
+        self.Records  = self.read()
+        self.Updated  = set()
+
+    # Accessors
+    def getFiles(self, location):
+        return [filename for filename, size in self.getRecord(location)["files"]]
+
+    def getSize(self, location):
+        return sum([size for filename, size in self.getRecord(location)["files"]])
+
+    def save(self):
+        if not self.Updated: return
+        records = self.read()
+        for key in self.Updated:
+            records[key] = self.Records[key]
+        temporary = "%s.%d.tmp" % (self.FileName, os.getpid())
+        with open(temporary, "w") as catalogfile:
+            json.dump(records, catalogfile, indent=1, sort_keys=True)
+        os.rename(temporary, self.FileName)
+        self.Records = records
+        self.Updated = set()
+
+    # Helper functions
+    def read(self):
+        if not os.path.exists(self.FileName): return {}
+        try:
+            with open(self.FileName) as catalogfile:
+                return json.load(catalogfile)
+        except ValueError:
+            self.log("Catalog file " + self.FileName + " is corrupted, starting from scratch")
+            return {}
+
+    def getKey(self, location):
+        return os.path.abspath(location)
+
+    def getRecord(self, location):
+        key = self.getKey(location)
+        directory = os.path.dirname(key)
+        if glob.has_magic(directory):
+            return self.resolve(key, None)
+        mtime = os.stat(directory).st_mtime if os.path.isdir(directory) else None
+        record = self.Records.get(key)
+        if record is None or record["mtime"] != mtime:
+            record = self.resolve(key, mtime)
+            self.Records[key] = record
+            self.Updated.add(key)
+        return record
+
+    def resolve(self, key, mtime):
+        # the files are stored with absolute paths, so the record does not depend on the working directory
+        files = sorted(glob.glob(key))
+        return {"mtime" : mtime, "files" : [[filename, os.stat(filename).st_size] for filename in files]}
+
+    def log(self, message):
+        print time.ctime() + " InputCatalog: " + message
+
+#======================================================================
+
+Catalogs = {}
+
+def getCatalog(filename):
+    """Returns the catalog stored in filename, which is read only once per process."""
+    if filename not in Catalogs:
+        Catalogs[filename] = InputCatalog(filename)
+    return Catalogs[filename]
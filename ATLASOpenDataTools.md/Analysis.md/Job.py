@@ -1,48 +1,152 @@
 import ROOT
 import glob
 import importlib
+import os
 import sys
 import time
 
+import BatchReader
+import ColumnarCache
+import InputCatalog
 import JobStatistics
+import MetadataCache
+import SkimWriter
+import TupleReader
 
 #======================================================================
 
 class Job(object):
     """This class is a carrier class for a given analysis. It takes care of the technical details like
     file writing, setting up the input tree and providing statistics about the status of the analysis.    
+    Several analyses (comma separated in the configuration) can be run in one pass over the input. They share
+    a single TupleReader and a single GetEntry per event, each one writes into its own output file located
+    in a subdirectory named after the analysis.
     """
-    def __init__(self, processName, configuration, inputLocation):
+    def __init__(self, processName, configuration, inputLocation, entryRange = None, partNumber = None, inputFiles = None):
         super(Job, self).__init__()
         #Configurables
         self.Name       = processName
         self.Configuration = configuration
         self.MaxEvents     = configuration["MaxEvents"]
-        self.InputFiles    = glob.glob(inputLocation)
+        self.BatchSize     = configuration.get("BatchSize", 0)
+        self.BranchProbeEvents = configuration.get("BranchProbeEvents", 0)
+        self.EventChunkSize = configuration.get("EventChunkSize", 0)
+        self.InputLocation = inputLocation
+        # resolved on demand through the InputCatalog, so creating a job does not touch the input files
+        self.InputFiles    = inputFiles
+
+        # Entry range [first, last) to be processed, None processes all selected events of the input files
+        self.EntryRange    = entryRange
+        self.PartNumber    = partNumber
+        self.FirstEvent    = 0
+
+        self.AnalysisNames = [name.strip() for name in configuration["Analysis"].split(",")]
 
         # Outputs
-        self.OutputFileLocation = configuration["OutputDirectory"] + processName
-        self.OutputFile = None
+        self.OutputFileLocations = [self.getOutputFileLocation(analysisName, partNumber) for analysisName in self.AnalysisNames]
+        self.OutputFiles = []
+        self.SkimDirectory = configuration.get("SkimDirectory", "")
+        self.SkimWriter    = None
 
-        # Classes - InputTree and Analysis have to be created later otherwise parallel running does not work
+        # Classes - InputTree and Analyses have to be created later otherwise parallel running does not work
+        self.MetadataCache = None
+        self.ColumnarCache = None
         self.InputTree     = None
-        self.Analysis      = None
+        self.Store         = None
+        self.Analyses      = []
+        self.BatchMode     = False
         self.JobStatistics = JobStatistics.JobStatistics(self.Configuration["MaxEvents"], self.Configuration["Batch"])
 
     #Setup functions
     def setupTree(self):
+      self.ColumnarCache = self.getColumnarCache()
+      if self.ColumnarCache is not None:
+        self.log("Reading from the columnar cache in " + self.ColumnarCache.Directory)
+        return ColumnarCache.ColumnarTree(self.ColumnarCache)
+      if self.Configuration.get("Prefetching", False):
+        # has to be set before the first file is opened
+        ROOT.gEnv.SetValue("TFile.AsyncPrefetching", 1)
       tree = ROOT.TChain("mini")
-      for filename in self.InputFiles:
-        self.log("Adding file: " + filename)
-        tree.Add(filename)
+      metadataCache = self.getMetadataCache()
+      self.log("Adding %d input files for %s" % (len(self.getInputFiles()), self.InputLocation))
+      for filename in self.getInputFiles():
+        # with a known number of entries the chain does not need to open the file here
+        nentries = metadataCache.getEntries(filename) if metadataCache is not None else 0
+        if nentries > 0:
+          tree.Add(filename, nentries)
+        else:
+          tree.Add(filename)
       return tree
+
+    def setupCache(self):
+      """Configures the TTreeCache, which reads the baskets of all cached branches for a range of entries in few
+      large reads instead of one small read per basket. Without a learning phase the active branches of the
+      TupleReader are added to the cache directly.
+      """
+      cacheSize = self.Configuration.get("CacheSize", 0)
+      if cacheSize <= 0 or self.ColumnarCache is not None:
+        return
+      self.InputTree.SetCacheSize(cacheSize)
+      self.InputTree.SetCacheEntryRange(self.FirstEvent, self.FirstEvent + self.MaxEvents)
+      learnEntries = self.Configuration.get("CacheLearnEntries", 0)
+      if learnEntries > 0:
+        self.InputTree.SetCacheLearnEntries(learnEntries)
+      else:
+        for branchname, vartype, counter in self.Store.ActiveBranches:
+          self.InputTree.AddBranchToCache(branchname, True)
+        self.InputTree.StopCacheLearningPhase()
+        self.Store.setCacheBranches(True)
+      self.log("Using a TTreeCache of %d MB" % (cacheSize//1000000))
+
+    def getColumnarCache(self):
+      """Returns the columnar cache of the process if one is configured and up to date with the input files."""
+      directory = self.Configuration.get("ColumnarCache", "")
+      if directory == "":
+        return None
+      if self.SkimDirectory != "":
+        self.log("Skims are written from the ROOT files, the columnar cache is not used")
+        return None
+      cache = ColumnarCache.ColumnarCache(os.path.join(directory, self.Name))
+      if not cache.isValid(self.getInputFiles()):
+        self.log("No up to date columnar cache found in " + cache.Directory + ", reading the ROOT files")
+        return None
+      return cache
+
+    def getInputFiles(self):
+      if self.InputFiles is None:
+        catalog = self.getInputCatalog()
+        # sorted like the files of the catalog, so the entry numbers of the chain do not depend on the catalog
+        self.InputFiles = catalog.getFiles(self.InputLocation) if catalog is not None else sorted(glob.glob(self.InputLocation))
+      return self.InputFiles
+
+    def getInputSize(self):
+      """Total size of the input files in bytes, taken from the InputCatalog if one is configured."""
+      catalog = self.getInputCatalog()
+      if catalog is not None:
+        return catalog.getSize(self.InputLocation)
+      return sum([os.lstat(filename).st_size for filename in self.getInputFiles()])
+
+    def getInputCatalog(self):
+      # shared by all jobs of a process, so the catalog file is read only once
+      filename = self.Configuration.get("InputCatalog", "")
+      return InputCatalog.getCatalog(filename) if filename != "" else None
+
+    def getMetadataCache(self):
+      if self.MetadataCache is None and self.Configuration.get("MetadataCache", "") != "":
+        self.MetadataCache = MetadataCache.MetadataCache(self.Configuration["MetadataCache"])
+      return self.MetadataCache
                     
+    def createPart(self, first, last, partNumber):
+      """Returns a job processing the entries [first, last) of the input, which writes into a partial output file."""
+      return Job(self.Name, self.Configuration, self.InputLocation, (first, last), partNumber, self.getInputFiles())
+
     def createAnalysis(self, analysisName):
-        analysisName = self.Configuration["Analysis"]
         importedAnalysisModule = importlib.import_module("Analysis." + analysisName)
         analysis = getattr(importedAnalysisModule, analysisName)(self.Name)
-        analysis.Store.initializeTuple(self.InputTree)
+        analysis.setStore(self.Store)
         analysis.setIsData("data" in self.Name.lower())
+        analysis.setHistogramBackend(self.Configuration.get("HistogramBackend", "ROOT"))
+        analysis.setCutflowTiming(self.Configuration.get("CutflowTiming", False))
         return analysis
     
     #Execution functions                    
@@ -54,43 +158,183 @@ class Job(object):
     def initialize(self):
       self.log("Intialization phase")
       self.JobStatistics.resetTimer()
-      self.OutputFile = ROOT.TFile.Open(self.OutputFileLocation + ".root","RECREATE")
       self.InputTree = self.setupTree()
-      self.Analysis  = self.createAnalysis(self.Configuration["Analysis"])
+      if self.getInputCatalog() is not None:
+        self.getInputCatalog().save()
+      self.Store     = TupleReader.TupleReader()
+      if self.ColumnarCache is None:
+        self.Store.setMetadataCache(self.getMetadataCache())
+      self.Analyses  = [self.createAnalysis(analysisName) for analysisName in self.AnalysisNames]
+      self.BatchMode = self.useBatchMode()
+      self.setupBranchSelection()
+      self.Store.initializeTuple(self.InputTree)
+      if self.MetadataCache is not None:
+        self.MetadataCache.save()
       self.determineMaxEvents()
-      self.Analysis.doInitialization()
+      self.setupCache()
+      if self.SkimDirectory != "":
+        self.SkimWriter = SkimWriter.SkimWriter(self.Name, self.getSkimFileLocation(self.PartNumber) + ".root",
+                                                self.Configuration.get("SkimPreselection", "StandardPreselection"))
+        self.SkimWriter.initialize(self.InputTree, self.FirstEvent)
+      for analysis, location in zip(self.Analyses, self.OutputFileLocations):
+        # histograms are attached to the current directory, so the output file has to be opened first
+        self.OutputFiles.append(self.openOutputFile(location + ".root"))
+        analysis.doInitialization()
         
     def execute(self):
+      if self.BatchMode:
+        self.executeBatch()
+        return
+      if self.useChunkedEventLoop():
+        self.executeChunked()
+        return
       self.log("Now looping over %d events" % self.MaxEvents)
-      for n in xrange(self.MaxEvents):
-        self.JobStatistics.updateStatus(n)
-        self.InputTree.GetEntry(n)
-        self.Analysis.doAnalysis()
+      probeEnd = self.FirstEvent + self.BranchProbeEvents if self.Store.Tracking else -1
+      for n in xrange(self.FirstEvent, self.FirstEvent + self.MaxEvents):
+        if n == probeEnd:
+          self.finishBranchProbe()
+        self.JobStatistics.updateStatus(n - self.FirstEvent)
+        self.Store.getEntry(n)
+        for analysis in self.Analyses:
+          analysis.doAnalysis()
+        if self.SkimWriter is not None:
+          self.SkimWriter.process(self.Store)
+      if self.Store.Tracking:
+        self.finishBranchProbe()
+
+    def executeChunked(self):
+      self.log("Now looping over %d events read in chunks of %d" % (self.MaxEvents, self.EventChunkSize))
+      self.Store.useChunks()
+      for chunk in self.getChunkReader(self.EventChunkSize).chunks(self.FirstEvent, self.FirstEvent + self.MaxEvents):
+        self.Store.setChunk(chunk)
+        for i in xrange(len(chunk)):
+          self.JobStatistics.updateStatus(chunk.First + i - self.FirstEvent)
+          self.Store.setEntry(i)
+          for analysis in self.Analyses:
+            analysis.doAnalysis()
+
+    def executeBatch(self):
+      self.log("Now looping over %d events in chunks of %d" % (self.MaxEvents, self.BatchSize))
+      for chunk in self.getChunkReader(self.BatchSize).chunks(self.FirstEvent, self.FirstEvent + self.MaxEvents):
+        for analysis in self.Analyses:
+          analysis.doBatchAnalysis(chunk)
+        self.JobStatistics.updateStatus(chunk.Last - self.FirstEvent, True)
             
     def finalize(self):
       self.JobStatistics.updateStatus(self.MaxEvents, True)
       if not self.Configuration["Batch"]:
           print ""
-      self.Analysis.doFinalization()
-      self.OutputFile.Close()
+      for analysis, outputFile in zip(self.Analyses, self.OutputFiles):
+        outputFile.cd()
+        analysis.doFinalization()
+        outputFile.Close()
+      if self.SkimWriter is not None:
+        self.SkimWriter.finalize()
       self.log("finished successfully. Total time: %4.0fs" % self.JobStatistics.elapsedTime())
 
 
     # Helper functions
+    def setupBranchSelection(self):
+      """Restricts the readout to the branches declared by the analyses. If one of them does not declare its
+      branches, the accessed branches are recorded during the first BranchProbeEvents events instead.
+      """
+      if self.BatchMode or self.useChunkedEventLoop():
+        # entries are not read via GetEntry, so branches can not be activated late. The declared branches only
+        # cover analyze, analyzeBatch may read others, so all branches are read
+        return
+      if self.SkimDirectory != "":
+        # skims are cloned with the branches active at the start, branches activated late would be missing
+        return
+      required = [analysis.RequiredBranches for analysis in self.Analyses]
+      if None not in required:
+        self.Store.setBranchSelection(set().union(*required))
+        self.log("Reading %d declared branches" % len(self.Store.BranchSelection))
+      elif self.BranchProbeEvents > 0:
+        self.Store.startTracking()
+
+    def finishBranchProbe(self):
+      accessed = self.Store.stopTracking()
+      self.log("Branch probe finished, reading %d branches: %s" % (len(accessed), ", ".join(accessed)))
+
+    def useChunkedEventLoop(self):
+      # skims are filled from the buffers of the input tree, which are only set by GetEntry
+      return self.EventChunkSize > 0 and self.SkimDirectory == ""
+
+    def getChunkReader(self, chunkSize):
+      if self.ColumnarCache is not None:
+        return ColumnarCache.ColumnarReader(self.ColumnarCache, self.Store.ActiveBranches, chunkSize)
+      return BatchReader.BatchReader(self.InputTree, self.Store.ActiveBranches, chunkSize)
+
+    def useBatchMode(self):
+      if self.BatchSize <= 0:
+        return False
+      if self.SkimDirectory != "":
+        self.log("Skimming is done event by event, falling back to the event loop")
+        return False
+      for analysis in self.Analyses:
+        if not analysis.hasBatchAnalysis():
+          self.log(analysis.Name + " does not implement analyzeBatch, falling back to the event loop")
+          return False
+      return True
+
+    def getOutputFileLocation(self, analysisName, partNumber = None):
+      location = self.Configuration["OutputDirectory"]
+      if len(self.AnalysisNames) > 1:
+        location += analysisName + "/"
+      location += self.Name
+      if partNumber is not None:
+        location += ".part%d" % partNumber
+      return location
+
+    def getSkimFileLocation(self, partNumber = None):
+      location = self.SkimDirectory + self.Name
+      if partNumber is not None:
+        location += ".part%d" % partNumber
+      return location
+
+    def openOutputFile(self, filename):
+      directory = os.path.dirname(filename)
+      if directory != "" and not os.path.exists(directory):
+        try:
+          os.makedirs(directory)
+        except OSError:
+          # another worker may have created it in the meantime
+          pass
+      return ROOT.TFile.Open(filename, "RECREATE")
+
     def determineMaxEvents(self):
       nentries = self.InputTree.GetEntries()
       if nentries==0:
         self.log("Empty files! Abort!")
         sys.exit(1)
-      
-      if self.MaxEvents > nentries:
-        self.MaxEvents = nentries
-      
-      self.MaxEvents = int(self.MaxEvents*self.Configuration["Fraction"]) 
+
+      if self.EntryRange is not None:
+        self.FirstEvent = min(self.EntryRange[0], nentries)
+        self.MaxEvents  = min(self.EntryRange[1], nentries) - self.FirstEvent
+      else:
+        self.MaxEvents = self.selectedEvents(nentries)
       self.JobStatistics.setMaxEvents(self.MaxEvents)
 
+    def selectedEvents(self, nentries):
+      return int(min(self.MaxEvents, nentries)*self.Configuration["Fraction"])
+
+    def countEvents(self):
+      """Number of events the job processes, determined without setting up the analysis."""
+      if self.EntryRange is not None:
+        return self.EntryRange[1] - self.EntryRange[0]
+      metadataCache = self.getMetadataCache()
+      if metadataCache is not None:
+        nentries = sum([metadataCache.getEntries(filename) for filename in self.getInputFiles()])
+        metadataCache.save()
+        return self.selectedEvents(nentries)
+      tree = ROOT.TChain("mini")
+      for filename in self.getInputFiles():
+        tree.Add(filename)
+      return self.selectedEvents(tree.GetEntries())
+
     def log(self, message):
-      print time.ctime() + " Job " + self.Name + ": " + message
+      part = "" if self.PartNumber is None else " (part %d)" % self.PartNumber
+      print time.ctime() + " Job " + self.Name + part + ": " + message
               
         
 
@@ -0,0 +1,98 @@
+import math
+import numpy
+
+"""Four-vector kinematics without ROOT.TLorentzVector.
+The FourMomentum class is a light weight scalar replacement for the TLorentzVector in the per event code,
+it is pure python and therefore never crosses the PyROOT boundary.
+The Array Functions implement the same quantities on whole NumPy arrays for the columnar execution mode. Object
+collections are given as (px, py, pz, e) tuples of arrays, angles follow the TLorentzVector conventions.
+"""
+
+#======================================================================
+
+class FourMomentum(object):
+    """Scalar four-momentum in cartesian coordinates. Accessor names follow the physics objects of the TupleReader."""
+    __slots__ = ("Px", "Py", "Pz", "E")
+
+    def __init__(self, px, py, pz, e):
+        self.Px = px
+        self.Py = py
+        self.Pz = pz
+        self.E  = e
+
+    @staticmethod
+    def fromPtEtaPhiE(pt, eta, phi, e):
+        return FourMomentum(pt*math.cos(phi), pt*math.sin(phi), pt*math.sinh(eta), e)
+
+    def __add__(self, other):
+        return FourMomentum(self.Px + other.Px, self.Py + other.Py, self.Pz + other.Pz, self.E + other.E)
+
+    def pt(self):
+        return math.sqrt(self.Px*self.Px + self.Py*self.Py)
+
+    def eta(self):
+        return math.asinh(self.Pz/self.pt()) if self.pt() > 0 else math.copysign(10e10, self.Pz)
+
+    def phi(self):
+        return math.atan2(self.Py, self.Px) if (self.Px != 0 or self.Py != 0) else 0.0
+
+    def m2(self):
+        return self.E*self.E - self.Px*self.Px - self.Py*self.Py - self.Pz*self.Pz
+
+    def m(self):
+        # same convention as TLorentzVector::M, space-like vectors get a negative mass
+        m2 = self.m2()
+        return math.sqrt(m2) if m2 >= 0 else -math.sqrt(-m2)
+
+    def deltaPhi(self, other):
+        return deltaPhiScalar(self.phi(), other.phi())
+
+    def deltaR(self, other):
+        return math.hypot(self.eta() - other.eta(), self.deltaPhi(other))
+
+    def __str__(self):
+        return "FourMomentum: px: %4.3f  py: %4.3f  pz: %4.3f  e: %4.3f" % (self.Px, self.Py, self.Pz, self.E)
+
+# Scalar Functions
+def deltaPhiScalar(phi1, phi2):
+    dphi = phi1 - phi2
+    while dphi >= math.pi: dphi -= 2*math.pi
+    while dphi < -math.pi: dphi += 2*math.pi
+    return dphi
+
+def transverseMassScalar(pt1, phi1, pt2, phi2):
+    return math.sqrt(2*pt1*pt2*(1-math.cos(phi1 - phi2)))
+
+# Array Functions
+def toCartesian(pt, eta, phi, e):
+    return pt*numpy.cos(phi), pt*numpy.sin(phi), pt*numpy.sinh(eta), e
+
+def transverseMomentum(momentum):
+    px, py, pz, e = momentum
+    return numpy.sqrt(px*px + py*py)
+
+def invariantMass(momentum):
+    px, py, pz, e = momentum
+    m2 = e*e - px*px - py*py - pz*pz
+    return numpy.sign(m2)*numpy.sqrt(numpy.abs(m2))
+
+def deltaPhi(phi1, phi2):
+    return numpy.mod(phi1 - phi2 + numpy.pi, 2*numpy.pi) - numpy.pi
+
+def deltaR(eta1, phi1, eta2, phi2):
+    return numpy.hypot(eta1 - eta2, deltaPhi(phi1, phi2))
+
+def transverseMass(pt1, phi1, pt2, phi2):
+    return numpy.sqrt(2*pt1*pt2*(1-numpy.cos(phi1 - phi2)))
+
+def sumMomenta(*momenta):
+    """Sums any number of (px, py, pz, e) tuples of equally shaped arrays component by component."""
+    return tuple(sum(components) for components in zip(*momenta))
+
+def sumPerEvent(offsets, values):
+    """Sums a flat jagged array per event, events without entries get zero."""
+    cumulative = numpy.concatenate(([0], numpy.cumsum(values, dtype=numpy.float64)))
+    return cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+def sumMomentaPerEvent(offsets, momentum):
+    return tuple(sumPerEvent(offsets, component) for component in momentum)
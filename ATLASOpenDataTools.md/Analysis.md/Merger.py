@@ -0,0 +1,59 @@
+import ROOT
+import collections
+import os
+import time
+
+import EventCounter
+
+"""Merging of partial outputs, e.g. of jobs that processed parts of the same sample.
+All histograms written by the HistManager are summed by name across any number of partial files and the
+cutflows stored by the EventCounter are merged cut by cut (raw, weighted and timing), so that the merged file
+looks like the output of a single job.
+"""
+
+def mergeOutputFiles(target, sources, removeSources = True):
+    """Merges the sources into target and returns the merged EventCounter, None if merging failed."""
+    histograms = collections.OrderedDict()
+    counter = EventCounter.EventCounter(os.path.basename(target).replace(".root", ""))
+    for source in sources:
+        tfile = ROOT.TFile.Open(source)
+        if not tfile or tfile.IsZombie():
+            log("Could not open " + source + ", keeping partial files")
+            return None
+        if not counter.readResults(tfile):
+            log("No cutflow found in " + source)
+        for key in tfile.GetListOfKeys():
+            name = key.GetName()
+            if name in EventCounter.EventCounter.HistogramNames: continue
+            histogram = key.ReadObj()
+            if not histogram.InheritsFrom("TH1"): continue
+            if name in histograms:
+                histograms[name].Add(histogram)
+            else:
+                histogram.SetDirectory(0)
+                histograms[name] = histogram
+        tfile.Close()
+
+    output = ROOT.TFile.Open(target, "RECREATE")
+    [histogram.Write() for histogram in histograms.values()]
+    counter.writeResults()
+    output.Close()
+
+    if removeSources:
+        [os.remove(source) for source in sources if os.path.abspath(source) != os.path.abspath(target)]
+    return counter
+
+def mergeTreeFiles(target, sources, removeSources = True):
+    """Merges files holding trees (e.g. skims) like hadd does."""
+    merger = ROOT.TFileMerger(False)
+    merger.OutputFile(target, "RECREATE")
+    [merger.AddFile(source) for source in sources]
+    if not merger.Merge():
+        log("Merging into " + target + " failed, keeping partial files")
+        return False
+    if removeSources:
+        [os.remove(source) for source in sources]
+    return True
+
+def log(message):
+    print time.ctime() + " Merger: " + message
@@ -0,0 +1,95 @@
+import ROOT
+import json
+import os
+import time
+
+#======================================================================
+
+class MetadataCache(object):
+    """Sidecar cache for metadata of the input files (number of entries, maxima of branches like lep_n).
+    Records are keyed by the absolute path of the file and are only trusted as long as size and modification
+    time of the file are unchanged, so unchanged inputs never have to be scanned again.
+    The cache is a json file that is shared between runs and workers. Saving merges the records with the ones
+    on disk and replaces the file atomically, so concurrent workers at worst redo a scan.
+    """
+    TreeName = "mini"
+
+    def __init__(self, filename):
+        super(MetadataCache, self).__init__()
+        self.FileName = filename
+        self.Records  = self.read()
+        self.Updated  = set()
+
+    # Accessors
+    def getEntries(self, filename):
+        record = self.getRecord(filename)
+        if "entries" not in record:
+            entries = self.scan(filename, lambda tree: int(tree.GetEntries()))
+            if entries is None: return 0
+            record["entries"] = entries
+            self.Updated.add(self.getKey(filename))
+        return record["entries"]
+
+    def getMaximum(self, filename, branchname):
+        record = self.getRecord(filename)
+        if branchname not in record["maximum"]:
+            maximum = self.scan(filename, lambda tree: self.scanMaximum(tree, branchname))
+            if maximum is None: return 0
+            record["maximum"][branchname] = maximum
+            self.Updated.add(self.getKey(filename))
+        return record["maximum"][branchname]
+
+    def save(self):
+        if not self.Updated: return
+        records = self.read()
+        for key in self.Updated:
+            records[key] = self.Records[key]
+        temporary = "%s.%d.tmp" % (self.FileName, os.getpid())
+        with open(temporary, "w") as cachefile:
+            json.dump(records, cachefile, indent=1, sort_keys=True)
+        os.rename(temporary, self.FileName)
+        self.Records = records
+        self.Updated = set()
+
+    # Helper functions
+    def read(self):
+        if not os.path.exists(self.FileName): return {}
+        try:
+            with open(self.FileName) as cachefile:
+                return json.load(cachefile)
+        except ValueError:
+            self.log("Cache file " + self.FileName + " is corrupted, starting from scratch")
+            return {}
+
+    def getKey(self, filename):
+        return os.path.abspath(filename)
+
+    def getRecord(self, filename):
+        key  = self.getKey(filename)
+        stat = os.stat(filename)
+        record = self.Records.get(key)
+        if record is None or record["size"] != stat.st_size or record["mtime"] != stat.st_mtime:
+            record = {"size" : stat.st_size, "mtime" : stat.st_mtime, "maximum" : {}}
+            self.Records[key] = record
+            self.Updated.add(key)
+        return record
+
+    def scan(self, filename, function):
+        """Returns function(tree) for the tree of filename, None if the tree can not be read. Failed scans are not
+        stored, so the file is scanned again next time.
+        """
+        tfile = ROOT.TFile.Open(filename)
+        tree = tfile.Get(self.TreeName) if tfile and not tfile.IsZombie() else None
+        value = function(tree) if tree else None
+        if tfile: tfile.Close()
+        if value is None:
+            self.log("Could not read the tree " + self.TreeName + " from " + filename + ", the file is not cached")
+        return value
+
+    def scanMaximum(self, tree, branchname):
+        tree.SetBranchStatus("*", 0)
+        tree.SetBranchStatus(branchname, 1)
+        return int(tree.GetMaximum(branchname))
+
+    def log(self, message):
+        print time.ctime() + " MetadataCache: " + message
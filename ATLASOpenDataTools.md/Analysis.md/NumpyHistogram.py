@@ -0,0 +1,97 @@
+import ROOT
+import numpy
+
+#======================================================================
+
+class NumpyHistogram(object):
+    """One dimensional histogram with fixed binning, which keeps the sum of weights and of squared weights of every
+    bin (including underflow and overflow) in NumPy arrays. Bins and statistics follow the conventions of the ROOT
+    TH1D, so that the histogram can be converted into a TH1D when it is written. Filling does not call into ROOT and
+    histograms can be pickled.
+    """
+    def __init__(self, name, title, nbins, low, high):
+        super(NumpyHistogram, self).__init__()
+        self.Name    = name
+        self.Title   = title
+        self.NBins   = nbins
+        self.Low     = float(low)
+        self.High    = float(high)
+        self.SumW    = numpy.zeros(nbins + 2)
+        self.SumW2   = numpy.zeros(nbins + 2)
+        # sum of weights, squared weights, weight*x and weight*x*x of the entries within the range, as in TH1::GetStats
+        self.Stats   = numpy.zeros(4)
+        self.Entries = 0.
+
+    @staticmethod
+    def fromTH1(histogram):
+        """Creates a NumpyHistogram with the name, titles, binning and content of a ROOT histogram with fixed binning."""
+        axis = histogram.GetXaxis()
+        title = ";".join([histogram.GetTitle(), axis.GetTitle(), histogram.GetYaxis().GetTitle()])
+        result = NumpyHistogram(histogram.GetName(), title, axis.GetNbins(), axis.GetXmin(), axis.GetXmax())
+        result.SumW  = numpy.array([histogram.GetBinContent(i) for i in range(result.NBins + 2)])
+        result.SumW2 = numpy.array([histogram.GetBinError(i)**2 for i in range(result.NBins + 2)])
+        histogram.GetStats(result.Stats)
+        result.Entries = histogram.GetEntries()
+        return result
+
+    @staticmethod
+    def isSupported(histogram):
+        return histogram.GetDimension() == 1 and histogram.GetXaxis().GetXbins().GetSize() == 0
+
+    # Filling
+    def Fill(self, value, weight = 1.):
+        bin = self.findBin(value)
+        self.SumW[bin]  += weight
+        self.SumW2[bin] += weight*weight
+        self.Entries    += 1
+        if 0 < bin <= self.NBins:
+            self.Stats += (weight, weight*weight, weight*value, weight*value*value)
+
+    def FillN(self, n, values, weights = None):
+        values  = numpy.asarray(values, dtype=numpy.float64)[:n]
+        weights = numpy.ones(n) if weights is None else numpy.asarray(weights, dtype=numpy.float64)[:n]
+        bins = self.findBins(values)
+        self.SumW  += numpy.bincount(bins, weights, minlength=self.NBins + 2)
+        self.SumW2 += numpy.bincount(bins, weights*weights, minlength=self.NBins + 2)
+        self.Entries += n
+        inRange = (bins > 0) & (bins <= self.NBins)
+        x, w = values[inRange], weights[inRange]
+        self.Stats += (w.sum(), (w*w).sum(), (w*x).sum(), (w*x*x).sum())
+
+    # Output
+    def toTH1D(self):
+        """Returns a TH1D with the content of the histogram, created in the current directory."""
+        histogram = ROOT.TH1D(self.Name, self.Title, self.NBins, self.Low, self.High)
+        histogram.Sumw2()
+        for i in range(self.NBins + 2):
+            histogram.SetBinContent(i, self.SumW[i])
+            histogram.SetBinError(i, numpy.sqrt(self.SumW2[i]))
+        histogram.PutStats(numpy.array(self.Stats))
+        histogram.SetEntries(self.Entries)
+        return histogram
+
+    def Write(self):
+        return self.toTH1D().Write()
+
+    def GetName(self):
+        return self.Name
+
+    def GetEntries(self):
+        return self.Entries
+
+    def GetBinContent(self, bin):
+        return self.SumW[bin]
+
+    # Helper functions
+    def findBin(self, value):
+        # same as TAxis::FindFixBin, values that are not a number end up in the overflow
+        if value < self.Low: return 0
+        if not value < self.High: return self.NBins + 1
+        return 1 + int(self.NBins*(value - self.Low)/(self.High - self.Low))
+
+    def findBins(self, values):
+        bins = numpy.full(len(values), self.NBins + 1, dtype=numpy.int64)
+        bins[values < self.Low] = 0
+        inside = (values >= self.Low) & (values < self.High)
+        bins[inside] = 1 + (self.NBins*(values[inside] - self.Low)/(self.High - self.Low)).astype(numpy.int64)
+        return bins
@@ -0,0 +1,149 @@
+import Queue
+import math
+import time
+import traceback
+from multiprocessing import Pool
+
+#======================================================================
+
+def runTask(taskId, job):
+    """Runs a job in a worker and returns its id, the elapsed time and the traceback if it failed."""
+    start = time.time()
+    try:
+        job.run()
+    except (Exception, SystemExit):
+        return taskId, time.time() - start, traceback.format_exc()
+    return taskId, time.time() - start, None
+
+#======================================================================
+
+class Workload(object):
+    """Bookkeeping of the events of one process that are not handed out yet and of the throughput observed so far."""
+    def __init__(self, job, nEvents):
+        super(Workload, self).__init__()
+        self.Job             = job
+        self.NEvents         = nEvents
+        self.NextEvent       = 0
+        self.NParts          = 0
+        self.ProcessedEvents = 0
+        self.ProcessingTime  = 0.
+
+    def remainingEvents(self):
+        return self.NEvents - self.NextEvent
+
+#======================================================================
+
+class Scheduler(object):
+    """The Scheduler runs the jobs of all processes on a pool of workers. Instead of distributing a fixed list of
+    jobs, the events of the processes are handed out as tasks over ranges of events whenever a worker becomes idle.
+    Every process is first started with a balanced share of all events. The throughput of its finished tasks
+    (events per second, including the setup of the job) is then used to size its next tasks and to continue with
+    the process with the most remaining work. The tasks get smaller as the remaining work decreases, so all workers
+    finish at about the same time instead of waiting for a single straggler. Without splitting, every job is run
+    as a whole in the given order.
+    """
+    def __init__(self, nWorkers, split = True, minTaskTime = 10., partsPerWorker = 4):
+        super(Scheduler, self).__init__()
+        self.NWorkers       = nWorkers
+        self.Split          = split
+        self.MinTaskTime    = minTaskTime
+        self.PartsPerWorker = partsPerWorker
+        self.InitialTaskEvents = 1
+        self.Workloads      = []
+        self.Running        = {}
+        self.Tasks          = []
+
+    def addJobs(self, jobs):
+        for job in jobs:
+            # processes without selected events are still run once, so that they get an output file
+            self.Workloads.append(Workload(job, max(job.countEvents(), 1) if self.Split else 1))
+        totalEvents = sum([workload.NEvents for workload in self.Workloads])
+        # before any task has finished, the events are split into balanced shares
+        self.InitialTaskEvents = max(int(math.ceil(totalEvents/float(self.NWorkers*self.PartsPerWorker))), 1)
+
+    def run(self):
+        """Runs all tasks and returns the jobs that were executed, split processes are returned as their parts."""
+        results = Queue.Queue()
+        pool = Pool(processes=self.NWorkers)
+        nextId = 0
+        while True:
+            while len(self.Running) < self.NWorkers:
+                task = self.nextTask()
+                if task is None: break
+                self.Running[nextId] = task
+                pool.apply_async(runTask, (nextId, task[1]), callback=results.put)
+                nextId += 1
+            if not self.Running: break
+            taskId, elapsed, error = results.get()
+            if error is not None:
+                pool.terminate()
+                raise RuntimeError("Job %s failed:\n%s" % (self.Running[taskId][1].Name, error))
+            self.finishTask(self.Running.pop(taskId), elapsed)
+        pool.close()
+        pool.join()
+        return self.Tasks
+
+    # Helper functions
+    def nextTask(self):
+        """Returns the next task as a (workload, job, number of events) tuple, None if all events are handed out."""
+        pending = [workload for workload in self.Workloads if workload.remainingEvents() > 0]
+        if not pending:
+            return None
+        if not self.Split:
+            workload = pending[0]
+            workload.NextEvent = workload.NEvents
+            return self.addTask(workload, workload.Job, 1)
+        # processes that were not started yet come first, so that the cost of every process is measured early
+        workload = max(pending, key=lambda pending: (pending.NextEvent == 0, self.getRemainingTime(pending)))
+        nEvents = self.getTaskEvents(workload)
+        first, last = workload.NextEvent, workload.NextEvent + nEvents
+        workload.NextEvent = last
+        if first == 0 and last == workload.NEvents:
+            # the process fits into a single task and writes its output directly
+            return self.addTask(workload, workload.Job, nEvents)
+        job = workload.Job.createPart(first, last, workload.NParts)
+        workload.NParts += 1
+        return self.addTask(workload, job, nEvents)
+
+    def addTask(self, workload, job, nEvents):
+        if job.EntryRange is not None:
+            self.log("Starting %s (part %d), events %d to %d" % (job.Name, job.PartNumber, job.EntryRange[0], job.EntryRange[1]))
+        else:
+            self.log("Starting " + job.Name)
+        self.Tasks.append(job)
+        return (workload, job, nEvents)
+
+    def finishTask(self, task, elapsed):
+        workload, job, nEvents = task
+        workload.ProcessedEvents += nEvents
+        workload.ProcessingTime  += elapsed
+
+    def getTaskEvents(self, workload):
+        if workload.ProcessingTime == 0:
+            # the cost of a process is only known after its first task, until then it gets balanced shares
+            nEvents = self.InitialTaskEvents
+        else:
+            # guided self-scheduling: a task takes a share of the remaining time of all processes
+            remainingTime = sum([self.getRemainingTime(pending) for pending in self.Workloads])
+            nEvents = int(max(remainingTime/(2*self.NWorkers), self.MinTaskTime)*self.getThroughput(workload))
+        remaining = workload.remainingEvents()
+        # a small rest is not worth the setup of another task
+        if remaining - nEvents < nEvents//2:
+            return remaining
+        return max(nEvents, 1)
+
+    def getRemainingTime(self, workload):
+        throughput = self.getThroughput(workload)
+        return workload.remainingEvents()/(throughput if throughput is not None else 1.)
+
+    def getThroughput(self, workload):
+        """Events per second of the process, for processes without finished tasks the average of all processes."""
+        if workload.ProcessingTime > 0:
+            return workload.ProcessedEvents/workload.ProcessingTime
+        processingTime = sum([other.ProcessingTime for other in self.Workloads])
+        if processingTime > 0:
+            return sum([other.ProcessedEvents for other in self.Workloads])/processingTime
+        return None
+
+    def log(self, message):
+        print time.ctime() + " Scheduler: " + message
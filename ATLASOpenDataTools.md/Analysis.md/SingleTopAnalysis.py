@@ -1,6 +1,8 @@
 import AnalysisHelpers as AH
 import ROOT
+import numpy
 import Analysis
+import Kinematics
 
 #======================================================================
         
@@ -8,54 +10,60 @@ class SingleTopAnalysis(Analysis.Analysis):
   """Semileptonic SingleTopAnalysis loosely based on the ATLAS analyses of top pair events where 
   one W boson decays to leptons and one decays to hadrons.
   """
+  Cuts = ["EventCuts", "MET", "1 Lepton", "Jets", "btags"]
+
   def __init__(self, store):
     super(SingleTopAnalysis, self).__init__(store)
   
   def initialize(self):
-      self.hist_WtMass      =  self.addStandardHistogram("WtMass")
+      # histograms filled directly after the cut on the shown quantity
       self.hist_SingleTopMass  =  self.addStandardHistogram("SingleTopMass")
-      self.hist_SingleTopMassbefore  =  self.addStandardHistogram("SingleTopMassbefore")
-
-      self.hist_leptn       =  self.addStandardHistogram("lep_n")
-      self.hist_leptpt      =  self.addStandardHistogram("lep_pt")
-      self.hist_lepteta     =  self.addStandardHistogram("lep_eta")
-      self.hist_leptE       =  self.addStandardHistogram("lep_E")
-      self.hist_leptphi     =  self.addStandardHistogram("lep_phi")
-      self.hist_leptch      =  self.addStandardHistogram("lep_charge")
-      self.hist_leptID      =  self.addStandardHistogram("lep_type")
-      self.hist_leptptc     =  self.addStandardHistogram("lep_ptconerel30")
-      self.hist_leptetc     =  self.addStandardHistogram("lep_etconerel20")
-      self.hist_lepz0       =  self.addStandardHistogram("lep_z0")
-      self.hist_lepd0       =  self.addStandardHistogram("lep_d0")
-
-      self.hist_njets       =  self.addStandardHistogram("n_jets")  
-      self.hist_njetsbefore       =  self.addStandardHistogram("n_jetsbefore")
-      self.hist_jetspt      =  self.addStandardHistogram("jet_pt")       
-      self.hist_jetm        =  self.addStandardHistogram("jet_m")        
-      self.hist_jetJVT      =  self.addStandardHistogram("jet_jvt")      
-      self.hist_jeteta      =  self.addStandardHistogram("jet_eta")
-      self.hist_deltaeta      =  self.addStandardHistogram("delta_eta") 
-      self.hist_leta      =  self.addStandardHistogram("jet_leta")
-      self.hist_ht      =  self.addStandardHistogram("ht") 
-      self.hist_deltaetabefore      =  self.addStandardHistogram("delta_etabefore") 
-      self.hist_letabefore      =  self.addStandardHistogram("jet_letabefore")
-      self.hist_htbefore      =  self.addStandardHistogram("htbefore")    
-      self.hist_jetmv2c10   =  self.addStandardHistogram("jet_MV2c10")     
-      self.hist_jetphi      =  self.addStandardHistogram("jet_phi")
-
-      self.hist_etmiss      = self.addStandardHistogram("etmiss")
-      self.hist_vxp_z       = self.addStandardHistogram("vxp_z")
-      self.hist_pvxp_n      = self.addStandardHistogram("pvxp_n")
+      self.hist_leta        =  self.addStandardHistogram("jet_leta")
+      self.hist_deltaeta    =  self.addStandardHistogram("delta_eta")
+      self.hist_ht          =  self.addStandardHistogram("ht")
+
+      # histograms before the final cuts
+      self.hist_SingleTopMassbefore = self.declareHistogram("SingleTopMassbefore", "mtop", stage = "before")
+      self.hist_njetsbefore    =  self.declareHistogram("n_jetsbefore", len, "jets", stage = "before")
+      self.hist_letabefore     =  self.declareHistogram("jet_letabefore", "eta", "lightjet", stage = "before")
+      self.hist_deltaetabefore =  self.declareHistogram("delta_etabefore", "deltaeta", stage = "before")
+      self.hist_htbefore       =  self.declareHistogram("htbefore", "ht", stage = "before")
+
+      # histograms of the selected events
+      self.hist_WtMass      =  self.declareHistogram("WtMass", "mtw")
+
+      self.hist_leptn       =  self.declareHistogram("lep_n", len, "leptons")
+      self.hist_leptpt      =  self.declareHistogram("lep_pt", "pt", "leptons")
+      self.hist_lepteta     =  self.declareHistogram("lep_eta", "eta", "leptons")
+      self.hist_leptE       =  self.declareHistogram("lep_E", "e", "leptons")
+      self.hist_leptphi     =  self.declareHistogram("lep_phi", "phi", "leptons")
+      self.hist_leptch      =  self.declareHistogram("lep_charge", "charge", "leptons")
+      self.hist_leptID      =  self.declareHistogram("lep_type", "pdgId", "leptons")
+      self.hist_leptptc     =  self.declareHistogram("lep_ptconerel30", "isoptconerel30", "leptons")
+      self.hist_leptetc     =  self.declareHistogram("lep_etconerel20", "isoetconerel20", "leptons")
+      self.hist_lepz0       =  self.declareHistogram("lep_z0", "z0", "leptons")
+      self.hist_lepd0       =  self.declareHistogram("lep_d0", "d0", "leptons")
+
+      self.hist_njets       =  self.declareHistogram("n_jets", len, "jets")
+      self.hist_jetspt      =  self.declareHistogram("jet_pt", "pt", "jets")
+      self.hist_jetm        =  self.declareHistogram("jet_m", "m", "jets")
+      self.hist_jetJVT      =  self.declareHistogram("jet_jvt", "jvt", "jets")
+      self.hist_jeteta      =  self.declareHistogram("jet_eta", "eta", "jets")
+      self.hist_jetmv2c10   =  self.declareHistogram("jet_MV2c10", "mv2c10", "jets")
+      self.hist_jetphi      =  self.declareHistogram("jet_phi", "phi", "jets")
+
+      self.hist_etmiss      = self.declareHistogram("etmiss", "et", "etmiss")
+      self.hist_vxp_z       = self.declareHistogram("vxp_z", "primaryVertexPosition", "eventinfo")
+      self.hist_pvxp_n      = self.declareHistogram("pvxp_n", "numberOfVertices", "eventinfo")
   
   
   def analyze(self):
       # retrieving objects
       eventinfo = self.Store.getEventInfo()
       weight = eventinfo.scalefactor()*eventinfo.eventWeight() if not self.getIsData() else 1
-      self.countEvent("all", weight)
 
       # apply standard event based selection
-      if not AH.StandardEventCuts(eventinfo): return False
+      if not AH.passStandardEventCuts(self.Store): return False
       self.countEvent("EventCuts", weight)
 
       # neutrinos are expected, so cut on missing transverse momentum
@@ -64,14 +72,14 @@ class SingleTopAnalysis(Analysis.Analysis):
       self.countEvent("MET", weight)
       
       # one good lepton from one of the W boson decays is expected, so require exactly one good lepton
-      goodLeptons = AH.selectAndSortContainer(self.Store.getLeptons(), AH.isGoodLepton, lambda p: p.pt())
+      goodLeptons = AH.getGoodLeptons(self.Store)
       if not (len(goodLeptons) == 1): return False
       self.countEvent("1 Lepton", weight)
 
       leadlepton = goodLeptons[0]
       
       # two jets from one of the W boson decays as well as two b-jets from the top pair decays are expected
-      goodJets = AH.selectAndSortContainer(self.Store.getJets(), AH.isGoodJet, lambda p: p.pt())
+      goodJets = AH.getGoodJets(self.Store)
       if not len(goodJets) == 2: return False
       self.countEvent("Jets", weight)
 
@@ -89,26 +97,22 @@ class SingleTopAnalysis(Analysis.Analysis):
         else: lightjet = jet
 
       # apply a cut on the transverse mass of the W boson decaying to leptons
-      if not (AH.WTransverseMass(leadlepton, etmiss) > 50.0): return False
+      mtw = self.Store.memoize(("WTransverseMass", leadlepton.idNr), AH.WTransverseMass, leadlepton, etmiss)
+      if not (mtw > 50.0): return False
 
       Pi = 3.1416
-      leptoniso = leadlepton.pt() / ( 1 - ((Pi - abs(leadlepton.tlv().DeltaPhi(leadjet.tlv())) )/(Pi-1) ))
+      leptoniso = leadlepton.pt() / ( 1 - ((Pi - abs(leadlepton.p4().deltaPhi(leadjet.p4())) )/(Pi-1) ))
      # if not ( leptoniso > 40.0 ): return False
 
       # calculate top mass
       mtop = AH.SingleTopMassSebas(leadlepton,etmiss,bjet)
-      #if mtop>0 :  
-      self.hist_SingleTopMassbefore.Fill(mtop, weight)
 
       # New parameters
       deltaeta = abs(bjet.eta()-lightjet.eta())
       ht = leadlepton.pt()+lightjet.pt()+bjet.pt()+etmiss.et()
 
       # Histograms before cuts
-      self.hist_njetsbefore.Fill(len(goodJets), weight)
-      self.hist_letabefore.Fill(lightjet.eta(), weight)
-      self.hist_deltaetabefore.Fill(deltaeta, weight)
-      self.hist_htbefore.Fill(ht,weight)
+      self.fillStage("before", weight, mtop=mtop, jets=goodJets, lightjet=lightjet, deltaeta=deltaeta, ht=ht)
 
       #3. 130 < mtop < 200
       if not ( 150 < mtop and  mtop < 220 ):
@@ -130,41 +134,118 @@ class SingleTopAnalysis(Analysis.Analysis):
         return False
       self.hist_ht.Fill(ht,weight)  
 
-      # Histograms detailing event information
-      self.hist_vxp_z.Fill(eventinfo.primaryVertexPosition(), weight)
-      self.hist_pvxp_n.Fill(eventinfo.numberOfVertices(), weight)
+      # histograms detailing event information, the W boson, missing et, lepton and jet information
+      self.fillStage("final", weight, eventinfo=eventinfo, mtw=mtw, etmiss=etmiss, leptons=goodLeptons, jets=goodJets)
+      return True
+
+  def analyzeBatch(self, chunk, weights):
+      # apply standard event based selection
+      selected = AH.getStandardEventCutsMask(chunk)
+      self.countEvents("EventCuts", weights, selected)
+
+      # neutrinos are expected, so cut on missing transverse momentum
+      selected = selected & (chunk["met_et"]*0.001 > 30.0)
+      self.countEvents("MET", weights, selected)
+
+      # one good lepton from one of the W boson decays is expected, so require exactly one good lepton
+      leptons, leptonOffsets = AH.getGoodLeptonsJagged(chunk)
+      selected = selected & (numpy.diff(leptonOffsets) == 1)
+      self.countEvents("1 Lepton", weights, selected)
+
+      # two jets from one of the W boson decays as well as two b-jets from the top pair decays are expected
+      jets, jetOffsets = AH.getGoodJetsJagged(chunk)
+      selected = selected & (numpy.diff(jetOffsets) == 2)
+      self.countEvents("Jets", weights, selected)
+
+      # apply the b-tagging requirement using the MV2c10 algorithm at 80% efficiency
+      events = numpy.flatnonzero(selected)
+      leadjet, subleadjet = jets[jetOffsets[events]], jets[jetOffsets[events] + 1]
+      leadtagged = chunk["jet_MV2c10"][leadjet] > 0.7892
+      passed = leadtagged != (chunk["jet_MV2c10"][subleadjet] > 0.7892)
+      events, leadjet, subleadjet, leadtagged = events[passed], leadjet[passed], subleadjet[passed], leadtagged[passed]
+      self.countEvents("btags", weights[events])
 
-      #Extra histograms
-    
+      bjet     = numpy.where(leadtagged, leadjet, subleadjet)
+      lightjet = numpy.where(leadtagged, subleadjet, leadjet)
+      lepton   = leptons[leptonOffsets[events]]
+
+      # apply a cut on the transverse mass of the W boson decaying to leptons
+      leptonPt = chunk["lep_pt"][lepton]*0.001
+      etmiss   = chunk["met_et"][events]*0.001
+      etmissPhi = chunk["met_phi"][events]
+      mtw = Kinematics.transverseMass(leptonPt, chunk["lep_phi"][lepton], etmiss, etmissPhi)
+      passed = mtw > 50.0
+      events, lepton, bjet, lightjet = events[passed], lepton[passed], bjet[passed], lightjet[passed]
+      leptonPt, etmiss, etmissPhi, mtw = leptonPt[passed], etmiss[passed], etmissPhi[passed], mtw[passed]
+      weight = weights[events]
+
+      # calculate top mass
+      leptonP4 = Kinematics.toCartesian(leptonPt, chunk["lep_eta"][lepton], chunk["lep_phi"][lepton], chunk["lep_E"][lepton]*0.001)
+      bjetPt   = chunk["jet_pt"][bjet]*0.001
+      bjetP4   = Kinematics.toCartesian(bjetPt, chunk["jet_eta"][bjet], chunk["jet_phi"][bjet], chunk["jet_E"][bjet]*0.001)
+      mtop = AH.SingleTopMass(leptonP4, etmiss, etmissPhi, bjetP4)
+      self.fillBatch(self.hist_SingleTopMassbefore, mtop, weight)
+
+      # New parameters
+      lightjetEta = chunk["jet_eta"][lightjet]
+      deltaeta = numpy.abs(chunk["jet_eta"][bjet] - lightjetEta)
+      ht = leptonPt + chunk["jet_pt"][lightjet]*0.001 + bjetPt + etmiss
+
+      # Histograms before cuts
+      self.fillBatch(self.hist_njetsbefore, numpy.full(len(events), 2.0), weight)
+      self.fillBatch(self.hist_letabefore, lightjetEta, weight)
+      self.fillBatch(self.hist_deltaetabefore, deltaeta, weight)
+      self.fillBatch(self.hist_htbefore, ht, weight)
+
+      # the final cuts are applied one after the other, each followed by its histogram
+      cuts = [(self.hist_SingleTopMass, mtop, (150 < mtop) & (mtop < 220)),
+              (self.hist_leta, lightjetEta, numpy.abs(lightjetEta) > 1.5),
+              (self.hist_deltaeta, deltaeta, deltaeta > 1.5),
+              (self.hist_ht, ht, ht > 195)]
+      passed = numpy.ones(len(events), dtype=bool)
+      for hist, values, cut in cuts:
+        passed &= cut
+        self.fillBatch(hist, values[passed], weight[passed])
+      events, lepton, bjet, lightjet = events[passed], lepton[passed], bjet[passed], lightjet[passed]
+      leptonPt, etmiss, mtw, weight = leptonPt[passed], etmiss[passed], mtw[passed], weight[passed]
+
+      # Histograms detailing event information
+      self.fillBatch(self.hist_vxp_z, chunk["vxp_z"][events], weight)
+      self.fillBatch(self.hist_pvxp_n, chunk["pvxp_n"][events], weight)
 
       # histograms for the W boson properties
-      self.hist_WtMass.Fill(AH.WTransverseMass(leadlepton, etmiss), weight)
+      self.fillBatch(self.hist_WtMass, mtw, weight)
 
       # histograms for missing et
-      self.hist_etmiss.Fill(etmiss.et(),weight)  
+      self.fillBatch(self.hist_etmiss, etmiss, weight)
 
       # histograms detailing lepton information
-      self.hist_leptn.Fill(len(goodLeptons), weight)
-      self.hist_leptpt.Fill(leadlepton.pt(), weight)
-      self.hist_lepteta.Fill(leadlepton.eta(), weight)
-      self.hist_leptE.Fill(leadlepton.e(), weight)
-      self.hist_leptphi.Fill(leadlepton.phi(), weight)
-      self.hist_leptch.Fill(leadlepton.charge(), weight)
-      self.hist_leptID.Fill(leadlepton.pdgId(), weight)
-      self.hist_lepz0.Fill(leadlepton.z0(), weight)
-      self.hist_lepd0.Fill(leadlepton.d0(), weight)      
-      self.hist_leptptc.Fill(leadlepton.isoptconerel30(), weight)
-      self.hist_leptetc.Fill(leadlepton.isoetconerel20(), weight)
-      
+      self.fillBatch(self.hist_leptn, numpy.ones(len(events)), weight)
+      self.fillBatch(self.hist_leptpt, leptonPt, weight)
+      self.fillBatch(self.hist_lepteta, chunk["lep_eta"][lepton], weight)
+      self.fillBatch(self.hist_leptE, chunk["lep_E"][lepton]*0.001, weight)
+      self.fillBatch(self.hist_leptphi, chunk["lep_phi"][lepton], weight)
+      self.fillBatch(self.hist_leptch, chunk["lep_charge"][lepton], weight)
+      self.fillBatch(self.hist_leptID, chunk["lep_type"][lepton], weight)
+      self.fillBatch(self.hist_lepz0, chunk["lep_z0"][lepton], weight)
+      self.fillBatch(self.hist_lepd0, chunk["lep_trackd0pvunbiased"][lepton], weight)
+      self.fillBatch(self.hist_leptptc, chunk["lep_ptcone30"][lepton]/chunk["lep_pt"][lepton], weight)
+      self.fillBatch(self.hist_leptetc, chunk["lep_etcone20"][lepton]/chunk["lep_pt"][lepton], weight)
+
       # histograms detailing jet information
-      self.hist_njets.Fill(len(goodJets), weight)
-      [self.hist_jetm.Fill(jet.m(), weight) for jet in goodJets]
-      [self.hist_jetspt.Fill(jet.pt(), weight) for jet in goodJets]
-      [self.hist_jetJVT.Fill(jet.jvt(), weight) for jet in goodJets]
-      [self.hist_jeteta.Fill(jet.eta(), weight) for jet in goodJets]
-      [self.hist_jetmv2c10.Fill(jet.mv2c10(), weight) for jet in goodJets] 
-      [self.hist_jetphi.Fill(jet.phi(), weight) for jet in goodJets]
-      return True
+      goodJets  = numpy.concatenate((bjet, lightjet))
+      jetWeight = numpy.concatenate((weight, weight))
+      self.fillBatch(self.hist_njets, numpy.full(len(events), 2.0), weight)
+      self.fillBatch(self.hist_jetm, chunk["jet_m"][goodJets], jetWeight)
+      self.fillBatch(self.hist_jetspt, chunk["jet_pt"][goodJets]*0.001, jetWeight)
+      self.fillBatch(self.hist_jetJVT, chunk["jet_jvt"][goodJets], jetWeight)
+      self.fillBatch(self.hist_jeteta, chunk["jet_eta"][goodJets], jetWeight)
+      self.fillBatch(self.hist_jetmv2c10, chunk["jet_MV2c10"][goodJets], jetWeight)
+      self.fillBatch(self.hist_jetphi, chunk["jet_phi"][goodJets], jetWeight)
+
+      passedEvent = numpy.zeros(len(chunk), dtype=bool)
+      passedEvent[events] = True
+      return passedEvent
 
   def finalize(self):
       pass
@@ -0,0 +1,48 @@
+import ROOT
+import os
+import time
+
+import AnalysisHelpers as AH
+
+#======================================================================
+
+class SkimWriter(object):
+    """The SkimWriter writes the events passing a preselection into a compact tuple that can be used as input
+    for subsequent runs. Only the branches activated by the TupleReader are kept, since the cloned tree
+    contains only the branches that are enabled in the input tree.
+    The preselection is the name of a function in AnalysisHelpers that takes the Store and returns a bool.
+    """
+    def __init__(self, name, filename, preselection):
+        super(SkimWriter, self).__init__()
+        self.Name         = name
+        self.FileName     = filename
+        self.Preselection = getattr(AH, preselection)
+        self.File         = None
+        self.Tree         = None
+        self.NSelected    = 0
+
+    def initialize(self, tree, firstEntry):
+        directory = os.path.dirname(self.FileName)
+        if directory != "" and not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                pass
+        # the chain has to point to a tree before it can be cloned, the clone is created in the current directory
+        tree.LoadTree(firstEntry)
+        self.File = ROOT.TFile.Open(self.FileName, "RECREATE")
+        self.Tree = tree.CloneTree(0)
+
+    def process(self, store):
+        if not self.Preselection(store): return
+        self.Tree.Fill()
+        self.NSelected += 1
+
+    def finalize(self):
+        self.File.cd()
+        self.Tree.Write()
+        self.File.Close()
+        self.log("%d events written to %s" % (self.NSelected, self.FileName))
+
+    def log(self, message):
+        print time.ctime() + " SkimWriter " + self.Name + ": " + message
@@ -1,72 +1,118 @@
 """This file defines standard histograms which can be reused in various analyses.
 The ranges of these histograms should accomodate most analyses.
+The histograms are registered as HistogramSpecs (name, title, binning) in a dictionary, so looking up a histogram does not
+depend on the number of histograms and ROOT objects are only created when a histogram is booked. Analyses can register
+further specs or derive them from existing ones via clone. Other backends, e.g. the NumpyHistogram, are created from the
+same specs without instantiating a ROOT histogram.
 """
 
 import ROOT
 
+import NumpyHistogram
+
+#======================================================================
+
+class HistogramSpec(object):
+    """Name, title (including the axis titles) and fixed binning of a one dimensional histogram."""
+    def __init__(self, name, title, nbins, low, high):
+        super(HistogramSpec, self).__init__()
+        self.Name  = name
+        self.Title = title
+        self.NBins = nbins
+        self.Low   = low
+        self.High  = high
+
+    def createTH1D(self):
+        return ROOT.TH1D(self.Name, self.Title, self.NBins, self.Low, self.High)
+
+    def createNumpyHistogram(self):
+        return NumpyHistogram.NumpyHistogram(self.Name, self.Title, self.NBins, self.Low, self.High)
+
+    def clone(self, name, title = None):
+        """Returns a spec with the same binning under a new name, e.g. for the same quantity before and after cuts."""
+        return HistogramSpec(name, title if title is not None else self.Title, self.NBins, self.Low, self.High)
+
+# Registry
+Specs = {}
+
+def registerHistogram(name, title, nbins, low, high):
+    return registerSpec(HistogramSpec(name, title, nbins, low, high))
+
+def registerSpec(spec):
+    if spec.Name in Specs:
+        print "Standard histogram with name " + spec.Name + " is redefined!"
+    Specs[spec.Name] = spec
+    return spec
+
+def getSpec(name):
+    return Specs.get(name)
+
 def getStandardHistogram(name):
-    if (name == "vxp_z"):           return ROOT.TH1D("vxp_z",           "Primary Vertex Position; z_{Vertex}; Events", 40, -200,200)
-    if (name == "pvxp_n"):          return ROOT.TH1D("pvxp_n",          "Number of Vertices; N_{vertex}; Events", 30, -0.5,29.5)
-    if (name == "etmiss"):          return ROOT.TH1D("etmiss",          "Missing Transverse Momentum;p_{T,Miss} [GeV];Events", 20, 0,200)
-    
-    if (name == "SingleTopMass"):     return ROOT.TH1D("SingleTopMass",  " Mass Single Top ; M_{l,v,b} [GeV]; Events", 25, 0, 500)
-    if (name == "SingleTopMassbefore"):     return ROOT.TH1D("SingleTopMassbefore",  " Mass Single Top before cuts ; M_{l,v,b} [GeV]; Events", 25, 0, 500)
-
-                                                                        
-    if (name == "n_jets"):          return ROOT.TH1D("n_jets",          "Number of Jets;N_{jets};Events", 10, -0.5, 9.5)
-    if (name == "n_jetsbefore"):    return ROOT.TH1D("n_jetsbefore",    "Number of Jets before cuts;N_{jets};Events", 10, -0.5, 9.5)
-
-    if (name == "jet_pt"):          return ROOT.TH1D("jet_pt",          "Jet Transverse Momentum;p_{T}^{jet} [GeV];Jets", 40, 0, 200)
-    if (name == "jet_m"):           return ROOT.TH1D("jet_m",           "Jet Mass; m^{jet} [MeV]; Jets", 20, 0, 20000)
-    if (name == "jet_jvt"):         return ROOT.TH1D("jet_jvt",         "Jet Vertex Tagger; JVT ; Jets", 20, 0, 1)
-    if (name == "jet_eta"):         return ROOT.TH1D("jet_eta",         "Jet Pseudorapidity; #eta^{jet}; Jets", 30, -3, 3)
-    if (name == "jet_leta"):        return ROOT.TH1D("jet_leta",         "Jet-Forward Pseudorapidity; #eta^{jet}; Jets", 30, -3, 3)
-    if (name == "jet_letabefore"):        return ROOT.TH1D("jet_letabefore",         "Jet-Forward Pseudorapidity before cuts; #eta^{jet}; Jets", 30, -3, 3)
-    if (name == "delta_eta"):       return ROOT.TH1D("delta_eta",         "Jet-Forward Pseudorapidity; |#eta^{fw-jet}-#eta^{jet}|; Jets", 30, 0, 3)
-    if (name == "ht"):              return ROOT.TH1D("ht",         "H_t", 40, 0, 500)
-    if (name == "delta_etabefore"):       return ROOT.TH1D("delta_etabefore",         "Jet-Forward Pseudorapidity before cuts; |#eta^{fw-jet}-#eta^{jet}|; Jets", 30, 0, 3)
-    if (name == "htbefore"):              return ROOT.TH1D("htbefore",         "H_t before cuts", 40, 0, 500)
-    if (name == "jet_MV2c10"):      return ROOT.TH1D("jet_MV2c10",      "Jet MV2c10; MV2c10 weight ; Jets", 20, 0, 1)
-    if (name == "jet_phi"):         return ROOT.TH1D("jet_phi",         "Jet Azimuthal Angle ; #phi^{jet}; Jets", 32, -3.2, 3.2)
-    if (name == "lep_n"):           return ROOT.TH1D("lep_n",           "Number of Leptons; N_{lep} ;Events", 10, -0.5, 9.5)
-                                                                        
-    if (name == "lep_pt"):          return ROOT.TH1D("lep_pt",          "Lepton Transverse Momentum;p_{T}^{lep} [GeV];Leptons", 40, 0, 200)
-    if (name == "lep_eta"):         return ROOT.TH1D("lep_eta",         "Lepton Pseudorapidity; #eta^{lep}; Leptons", 30, -3, 3)
-    if (name == "lep_E"):           return ROOT.TH1D("lep_E",           "Lepton Energy; E^{lep} [GeV]; Leptons", 30, 0, 300)
-    if (name == "lep_phi"):         return ROOT.TH1D("lep_phi",         "Lepton Azimuthal Angle ; #phi^{lep}; Leptons", 32, -3.2, 3.2)
-    if (name == "lep_charge"):      return ROOT.TH1D("lep_charge",      "Lepton Charge; Q^{lep}; Leptons", 7, -1.75, 1.75)
-    if (name == "lep_type"):        return ROOT.TH1D("lep_type",        "Lepton PDG ID; PDGID^{lep}; Leptons", 31, -0.5, 30.5)
-    if (name == "lep_ptconerel30"): return ROOT.TH1D("lep_ptconerel30", "Lepton Relative Transverse Momentum Isolation; ptconerel30^{lep}; Leptons", 40, 0, 0.2)
-    if (name == "lep_etconerel20"): return ROOT.TH1D("lep_etconerel20", "Lepton Relative Transverse Energy Isolation; etconerel20^{lep}; Leptons", 40,  -0.05, 0.2)
-    if (name == "lep_z0"):          return ROOT.TH1D("lep_z0",          "Lepton z0 impact parameter; z_{0}^{lep} [mm]; Leptons", 40, -1, 1)
-    if (name == "lep_d0"):          return ROOT.TH1D("lep_d0",          "Lepton d0 impact parameter; d_{0}^{lep} [mm]; Leptons", 40, -1, 1)
-
-    if (name == "leadlep_pt"):          return ROOT.TH1D("leadlep_pt",          "Leading Lepton Transverse Momentum;p_{T}^{leadlep} [GeV];Leptons", 40, 0, 200)
-    if (name == "leadlep_eta"):         return ROOT.TH1D("leadlep_eta",         "Leading Lepton Pseudorapidity; #eta^{leadlep}; Leptons", 30, -3, 3)
-    if (name == "leadlep_E"):           return ROOT.TH1D("leadlep_E",           "Leading Lepton Energy; E^{leadlep} [GeV]; Leptons", 30, 0, 300)
-    if (name == "leadlep_phi"):         return ROOT.TH1D("leadlep_phi",         "Leading Lepton Azimuthal Angle ; #phi^{leadlep}; Leptons", 32, -3.2, 3.2)
-    if (name == "leadlep_charge"):      return ROOT.TH1D("leadlep_charge",      "Leading Lepton Charge; Q^{leadlep}; Leptons", 7, -1.75, 1.75)
-    if (name == "leadlep_type"):        return ROOT.TH1D("leadlep_type",        "Leading Lepton PDG ID; PDGID^{leadlep}; Leptons",  31, -0.5, 30.5)
-    if (name == "leadlep_ptconerel30"): return ROOT.TH1D("leadlep_ptconerel30", "Leading Lepton Relative Transverse Momentum Isolation; ptconerel30^{leadlep}; Leptons", 40, 0, 0.2)
-    if (name == "leadlep_etconerel20"): return ROOT.TH1D("leadlep_etconerel20", "Leading Lepton Relative Transverse Energy Isolation; etconerel20^{leadlep}; Leptons", 40, -0.05, 0.2)
-    if (name == "leadlep_z0"):          return ROOT.TH1D("leadlep_z0",          "Leading Lepton z0 impact parameter; z_{0}^{leadlep} [mm]; Leptons", 40, -1, 1)
-    if (name == "leadlep_d0"):          return ROOT.TH1D("leadlep_d0",          "Leading Lepton d0 impact parameter; d_{0}^{leadlep} [mm]; Leptons", 40, -1, 1)
-                                         
-    if (name == "traillep_pt"):          return ROOT.TH1D("traillep_pt",          "Trailing Lepton Transverse Momentum;p_{T}^{traillep} [GeV];Leptons", 40, 0, 200)
-    if (name == "traillep_eta"):         return ROOT.TH1D("traillep_eta",         "Trailing Lepton Pseudorapidity; #eta^{traillep}; Leptons", 30, -3, 3)
-    if (name == "traillep_E"):           return ROOT.TH1D("traillep_E",           "Trailing Lepton Energy; E^{traillep} [GeV]; Leptons", 30, 0, 300)
-    if (name == "traillep_phi"):         return ROOT.TH1D("traillep_phi",         "Trailing Lepton Azimuthal Angle ; #phi^{traillep}; Leptons", 32, -3.2, 3.2)
-    if (name == "traillep_charge"):      return ROOT.TH1D("traillep_charge",      "Trailing Lepton Charge; Q^{traillep}; Leptons", 7, -1.75, 1.75)
-    if (name == "traillep_type"):        return ROOT.TH1D("traillep_type",        "Trailing Lepton PDG ID; PDGID^{traillep}; Leptons",  31, -0.5, 30.5)
-    if (name == "traillep_ptconerel30"): return ROOT.TH1D("traillep_ptconerel30", "Trailing Lepton Relative Transverse Momentum Isolation; ptconerel30^{traillep} [GeV]; Leptons", 40, 0, 0.2)
-    if (name == "traillep_etconerel20"): return ROOT.TH1D("traillep_etconerel20", "Trailing Lepton Relative Transverse Energy Isolation; etconerel20^{traillep} [GeV]; Leptons", 40, -0.05, 0.2)
-    if (name == "traillep_z0"):          return ROOT.TH1D("traillep_z0",          "Trailing Lepton z0 impact parameter; z_{0}^{traillep} [mm]; Leptons", 40, -1, 1)
-    if (name == "traillep_d0"):          return ROOT.TH1D("traillep_d0",          "Trailing Lepton d0 impact parameter; d_{0}^{traillep} [mm]; Leptons", 40, -1, 1)
-                                        
-    if (name == "WtMass"):            return ROOT.TH1D("WtMass",            "Transverse Mass of the W Candidate; M_{T,W} [GeV]; Events", 40, 0, 200)
-    if (name == "TopMassRecbefore"):            return ROOT.TH1D("TopMassRecbefore",            "Transverse Mass of the W Candidate; M_{t} [GeV]; Events", 40, 0, 200)
-    if (name == "WtMassRecbefore"):            return ROOT.TH1D("WtMassRecbefore",            "Transverse Mass of the W Candidate Rec; M_{T,W} [GeV]; Events", 40, 0, 200)
-    if (name == "WtMassRec"):            return ROOT.TH1D("WtMassRec",            "Transverse Mass of the W Candidate Rec; M_{T,W} [GeV]; Events", 20, 60, 100)
-    if (name == "invMass"):           return ROOT.TH1D("invMass",           "Invariant Mass of the Z Candidate;M_{ll} [GeV]; Events", 30, 60,120)
-    
-    return None
+    spec = Specs.get(name)
+    return spec.createTH1D() if spec is not None else None
+
+#======================================================================
+
+# Standard Histograms
+registerHistogram("vxp_z",           "Primary Vertex Position; z_{Vertex}; Events", 40, -200,200)
+registerHistogram("pvxp_n",          "Number of Vertices; N_{vertex}; Events", 30, -0.5,29.5)
+registerHistogram("etmiss",          "Missing Transverse Momentum;p_{T,Miss} [GeV];Events", 20, 0,200)
+
+registerHistogram("SingleTopMass",  " Mass Single Top ; M_{l,v,b} [GeV]; Events", 25, 0, 500)
+registerHistogram("SingleTopMassbefore",  " Mass Single Top before cuts ; M_{l,v,b} [GeV]; Events", 25, 0, 500)
+
+registerHistogram("n_jets",          "Number of Jets;N_{jets};Events", 10, -0.5, 9.5)
+registerHistogram("n_jetsbefore",    "Number of Jets before cuts;N_{jets};Events", 10, -0.5, 9.5)
+
+registerHistogram("jet_pt",          "Jet Transverse Momentum;p_{T}^{jet} [GeV];Jets", 40, 0, 200)
+registerHistogram("jet_m",           "Jet Mass; m^{jet} [MeV]; Jets", 20, 0, 20000)
+registerHistogram("jet_jvt",         "Jet Vertex Tagger; JVT ; Jets", 20, 0, 1)
+registerHistogram("jet_eta",         "Jet Pseudorapidity; #eta^{jet}; Jets", 30, -3, 3)
+registerHistogram("jet_leta",         "Jet-Forward Pseudorapidity; #eta^{jet}; Jets", 30, -3, 3)
+registerHistogram("jet_letabefore",         "Jet-Forward Pseudorapidity before cuts; #eta^{jet}; Jets", 30, -3, 3)
+registerHistogram("delta_eta",         "Jet-Forward Pseudorapidity; |#eta^{fw-jet}-#eta^{jet}|; Jets", 30, 0, 3)
+registerHistogram("ht",         "H_t", 40, 0, 500)
+registerHistogram("delta_etabefore",         "Jet-Forward Pseudorapidity before cuts; |#eta^{fw-jet}-#eta^{jet}|; Jets", 30, 0, 3)
+registerHistogram("htbefore",         "H_t before cuts", 40, 0, 500)
+registerHistogram("jet_MV2c10",      "Jet MV2c10; MV2c10 weight ; Jets", 20, 0, 1)
+registerHistogram("jet_phi",         "Jet Azimuthal Angle ; #phi^{jet}; Jets", 32, -3.2, 3.2)
+registerHistogram("lep_n",           "Number of Leptons; N_{lep} ;Events", 10, -0.5, 9.5)
+
+registerHistogram("lep_pt",          "Lepton Transverse Momentum;p_{T}^{lep} [GeV];Leptons", 40, 0, 200)
+registerHistogram("lep_eta",         "Lepton Pseudorapidity; #eta^{lep}; Leptons", 30, -3, 3)
+registerHistogram("lep_E",           "Lepton Energy; E^{lep} [GeV]; Leptons", 30, 0, 300)
+registerHistogram("lep_phi",         "Lepton Azimuthal Angle ; #phi^{lep}; Leptons", 32, -3.2, 3.2)
+registerHistogram("lep_charge",      "Lepton Charge; Q^{lep}; Leptons", 7, -1.75, 1.75)
+registerHistogram("lep_type",        "Lepton PDG ID; PDGID^{lep}; Leptons", 31, -0.5, 30.5)
+registerHistogram("lep_ptconerel30", "Lepton Relative Transverse Momentum Isolation; ptconerel30^{lep}; Leptons", 40, 0, 0.2)
+registerHistogram("lep_etconerel20", "Lepton Relative Transverse Energy Isolation; etconerel20^{lep}; Leptons", 40,  -0.05, 0.2)
+registerHistogram("lep_z0",          "Lepton z0 impact parameter; z_{0}^{lep} [mm]; Leptons", 40, -1, 1)
+registerHistogram("lep_d0",          "Lepton d0 impact parameter; d_{0}^{lep} [mm]; Leptons", 40, -1, 1)
+
+registerHistogram("leadlep_pt",          "Leading Lepton Transverse Momentum;p_{T}^{leadlep} [GeV];Leptons", 40, 0, 200)
+registerHistogram("leadlep_eta",         "Leading Lepton Pseudorapidity; #eta^{leadlep}; Leptons", 30, -3, 3)
+registerHistogram("leadlep_E",           "Leading Lepton Energy; E^{leadlep} [GeV]; Leptons", 30, 0, 300)
+registerHistogram("leadlep_phi",         "Leading Lepton Azimuthal Angle ; #phi^{leadlep}; Leptons", 32, -3.2, 3.2)
+registerHistogram("leadlep_charge",      "Leading Lepton Charge; Q^{leadlep}; Leptons", 7, -1.75, 1.75)
+registerHistogram("leadlep_type",        "Leading Lepton PDG ID; PDGID^{leadlep}; Leptons",  31, -0.5, 30.5)
+registerHistogram("leadlep_ptconerel30", "Leading Lepton Relative Transverse Momentum Isolation; ptconerel30^{leadlep}; Leptons", 40, 0, 0.2)
+registerHistogram("leadlep_etconerel20", "Leading Lepton Relative Transverse Energy Isolation; etconerel20^{leadlep}; Leptons", 40, -0.05, 0.2)
+registerHistogram("leadlep_z0",          "Leading Lepton z0 impact parameter; z_{0}^{leadlep} [mm]; Leptons", 40, -1, 1)
+registerHistogram("leadlep_d0",          "Leading Lepton d0 impact parameter; d_{0}^{leadlep} [mm]; Leptons", 40, -1, 1)
+
+registerHistogram("traillep_pt",          "Trailing Lepton Transverse Momentum;p_{T}^{traillep} [GeV];Leptons", 40, 0, 200)
+registerHistogram("traillep_eta",         "Trailing Lepton Pseudorapidity; #eta^{traillep}; Leptons", 30, -3, 3)
+registerHistogram("traillep_E",           "Trailing Lepton Energy; E^{traillep} [GeV]; Leptons", 30, 0, 300)
+registerHistogram("traillep_phi",         "Trailing Lepton Azimuthal Angle ; #phi^{traillep}; Leptons", 32, -3.2, 3.2)
+registerHistogram("traillep_charge",      "Trailing Lepton Charge; Q^{traillep}; Leptons", 7, -1.75, 1.75)
+registerHistogram("traillep_type",        "Trailing Lepton PDG ID; PDGID^{traillep}; Leptons",  31, -0.5, 30.5)
+registerHistogram("traillep_ptconerel30", "Trailing Lepton Relative Transverse Momentum Isolation; ptconerel30^{traillep} [GeV]; Leptons", 40, 0, 0.2)
+registerHistogram("traillep_etconerel20", "Trailing Lepton Relative Transverse Energy Isolation; etconerel20^{traillep} [GeV]; Leptons", 40, -0.05, 0.2)
+registerHistogram("traillep_z0",          "Trailing Lepton z0 impact parameter; z_{0}^{traillep} [mm]; Leptons", 40, -1, 1)
+registerHistogram("traillep_d0",          "Trailing Lepton d0 impact parameter; d_{0}^{traillep} [mm]; Leptons", 40, -1, 1)
+
+registerHistogram("WtMass",            "Transverse Mass of the W Candidate; M_{T,W} [GeV]; Events", 40, 0, 200)
+registerHistogram("TopMassRecbefore",            "Transverse Mass of the W Candidate; M_{t} [GeV]; Events", 40, 0, 200)
+registerHistogram("WtMassRecbefore",            "Transverse Mass of the W Candidate Rec; M_{T,W} [GeV]; Events", 40, 0, 200)
+registerHistogram("WtMassRec",            "Transverse Mass of the W Candidate Rec; M_{T,W} [GeV]; Events", 20, 60, 100)
+registerHistogram("invMass",           "Invariant Mass of the Z Candidate;M_{ll} [GeV]; Events", 30, 60,120)
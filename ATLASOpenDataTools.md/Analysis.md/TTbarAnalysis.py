@@ -1,6 +1,7 @@
 import AnalysisHelpers as AH
 import ROOT
 import Analysis
+import Combinatorics
 
 #======================================================================
         
@@ -8,6 +9,8 @@ class TTbarAnalysis(Analysis.Analysis):
   """Semileptonic TTbarAnalysis loosely based on the ATLAS analyses of top pair events where 
   one W boson decays to leptons and one decays to hadrons.
   """
+  Cuts = ["EventCuts", "MET", "1 Lepton", "Jets", "btags"]
+
   def __init__(self, store):
     super(TTbarAnalysis, self).__init__(store)
   
@@ -46,10 +49,9 @@ class TTbarAnalysis(Analysis.Analysis):
       # retrieving objects
       eventinfo = self.Store.getEventInfo()
       weight = eventinfo.scalefactor()*eventinfo.eventWeight() if not self.getIsData() else 1
-      self.countEvent("all", weight)
 
       # apply standard event based selection
-      if not AH.StandardEventCuts(eventinfo): return False
+      if not AH.passStandardEventCuts(self.Store): return False
       self.countEvent("EventCuts", weight)
 
       # neutrinos are expected, so cut on missing transverse momentum
@@ -58,14 +60,14 @@ class TTbarAnalysis(Analysis.Analysis):
       self.countEvent("MET", weight)
       
       # one good lepton from one of the W boson decays is expected, so require exactly one good lepton
-      goodLeptons = AH.selectAndSortContainer(self.Store.getLeptons(), AH.isGoodLepton, lambda p: p.pt())
+      goodLeptons = AH.getGoodLeptons(self.Store)
       if not (len(goodLeptons) == 1): return False
       self.countEvent("1 Lepton", weight)
 
       leadlepton = goodLeptons[0]
       
       # two jets from one of the W boson decays as well as two b-jets from the top pair decays are expected
-      goodJets = AH.selectAndSortContainer(self.Store.getJets(), AH.isGoodJet, lambda p: p.pt())
+      goodJets = AH.getGoodJets(self.Store)
       if not len(goodJets) >= 4: return False
       self.countEvent("Jets", weight)
 
@@ -75,39 +77,29 @@ class TTbarAnalysis(Analysis.Analysis):
       self.countEvent("btags", weight)
 
       # apply a cut on the transverse mass of the W boson decaying to leptons
-      if not (AH.WTransverseMass(leadlepton, etmiss) > 30.0): return False
-
-      #Chossing pt
-      ptmax2 = goodJets[0].pt()
-      ptmax3 = -999
-      jetsrec=[goodJets[0],goodJets[0],goodJets[0]]
-      jetsrec2=[goodJets[0],goodJets[0]]
-      for i in range(0,len(goodJets)-1):
-        for j in range(i+1,len(goodJets)-1):
-          for k in range(j+1,len(goodJets)-1):
-            if ( ( goodJets[i].tlv() + goodJets[j].tlv() + goodJets[k].tlv() ).Pt() > ptmax3 ):
-              ptmax3 = ( goodJets[i].tlv() + goodJets[j].tlv() + goodJets[k].tlv() ).Pt()
-              jetsrec =[goodJets[i],goodJets[j],goodJets[k]]
-      for l in range(0,2):
-        for m in range(l+1,2):
-          if ( ( jetsrec[l].tlv()+jetsrec[m].tlv() ).Pt()>ptmax2 ):
-              ptmax2 =  ( jetsrec[l].tlv()+jetsrec[m].tlv() ).Pt()
-              jetsrec2 = [jetsrec[l],jetsrec[m]]
-      wrec = jetsrec2[0].tlv()+jetsrec2[1].tlv()
-      toprec = jetsrec[0].tlv()+jetsrec[1].tlv()+jetsrec[2].tlv()
-      self.hist_TopMassRecbefore.Fill(toprec.M(),weight)
-      self.hist_WtMassRecbefore.Fill(wrec.M(),weight)
+      mtw = self.Store.memoize(("WTransverseMass", leadlepton.idNr), AH.WTransverseMass, leadlepton, etmiss)
+      if not (mtw > 30.0): return False
+
+      # the hadronic top candidate is the triplet of jets (the softest jet excluded) with the highest summed pt
+      jetsrec = [goodJets[i] for i in Combinatorics.highestPtCombination(goodJets[:-1], 3)]
+      toprec = jetsrec[0].p4()+jetsrec[1].p4()+jetsrec[2].p4()
+      # the W candidate is built from the two leading jets of the triplet if their summed pt exceeds the one of the leading jet
+      wrec = jetsrec[0].p4()+jetsrec[1].p4()
+      if not wrec.pt() > goodJets[0].pt():
+        wrec = goodJets[0].p4()+goodJets[0].p4()
+      self.hist_TopMassRecbefore.Fill(toprec.m(),weight)
+      self.hist_WtMassRecbefore.Fill(wrec.m(),weight)
 
       #Applying cut
-      if (wrec.M()-10<70 or wrec.M()+10>90):
+      if (wrec.m()-10<70 or wrec.m()+10>90):
         return False
-      self.hist_WtMassRec.Fill(wrec.M(),weight)
+      self.hist_WtMassRec.Fill(wrec.m(),weight)
       # Histograms detailing event information
       self.hist_vxp_z.Fill(eventinfo.primaryVertexPosition(), weight)
       self.hist_pvxp_n.Fill(eventinfo.numberOfVertices(), weight)
 
       # histograms for the W boson properties
-      self.hist_WtMass.Fill(AH.WTransverseMass(leadlepton, etmiss), weight)
+      self.hist_WtMass.Fill(mtw, weight)
 
       # histograms for missing et
       self.hist_etmiss.Fill(etmiss.et(),weight)  
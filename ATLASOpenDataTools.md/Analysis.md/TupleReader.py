@@ -1,16 +1,80 @@
 import ROOT
+import numpy
+import time
 from array import array
 
+import Kinematics
+
 #======================================================================
 
 class TupleReader(object):
     """ This class implements the rules that govern the readout of the ROOT tuples and and provide a caching facility.
     Caching improves the readout by eliminating the need for branch address lookup each time the variable is accessed.
+    The set of activated branches can be restricted to a selection of branch names. Alternatively the reader can
+    track which branches are accessed during the first events and deactivate all others afterwards. Branches that
+    are not active are activated again on their first access, so a too small selection only costs time.
+    Instead of reading entry by entry via GetEntry the reader can be fed with chunks of NumPy arrays (see useChunks),
+    then the datamembers are views into the arrays of the chunk and no values are copied per event.
     """
+    # Branches in MeV, in chunk mode they are converted to GeV once per chunk instead of on every access
+    EnergyBranches = ("lep_pt", "lep_E", "jet_pt", "jet_E", "met_et")
 
     def __init__(self):
         super(TupleReader, self).__init__()
         self.Tree = None
+        self.MetadataCache = None
+        self.BranchSelection = None
+        self.Tracking = False
+        self.AccessedBranches = set()
+        self.CacheBranches = False
+        self.Buffers = {}
+        self.Members = {}
+        self.ChunkCounters = []
+        self.ChunkObjects  = []
+        # incremented for every entry read, invalidates all per event caches
+        self.Event = 0
+        self.Memo      = {}
+        self.MemoEvent = -1
+        self.EventInfo = None
+        self.EtMiss    = None
+        self.Leptons   = []
+        self.Jets      = []
+
+    def setMetadataCache(self, metadataCache):
+        self.MetadataCache = metadataCache
+
+    def setCacheBranches(self, cacheBranches):
+        """Keeps the branches of the TTreeCache in sync with the active branches from now on."""
+        self.CacheBranches = cacheBranches
+
+    def setBranchSelection(self, branches):
+        """Restricts the readout to the given branch names, None activates all branches known to the reader."""
+        self.BranchSelection = None if branches is None else set(branches)
+
+    def startTracking(self):
+        """Records the accessed branches from now on, has to be called before initializeTuple."""
+        self.Tracking = True
+        self.AccessedBranches = set()
+
+    def stopTracking(self):
+        """Deactivates all branches that were not accessed since startTracking and returns the accessed ones."""
+        tracked = [(name, value) for name, value in self.__dict__.items() if isinstance(value, TrackedBuffer)]
+        # object branches can only be read together with their counter
+        for name, value in tracked:
+          if value.BranchName in self.AccessedBranches and value.Counter is not None:
+            self.AccessedBranches.add(value.Counter)
+        for name, value in tracked:
+          if value.BranchName in self.AccessedBranches:
+            setattr(self, name, value.Buffer)
+          else:
+            self.Tree.SetBranchStatus(value.BranchName, 0)
+            if self.CacheBranches:
+              self.Tree.DropBranchFromCache(value.BranchName, True)
+            setattr(self, name, InactiveBuffer(self, value.BranchName, value.VarType, value.Counter, value.Buffer))
+        self.ActiveBranches = [branch for branch in self.ActiveBranches if branch[0] in self.AccessedBranches]
+        self.Tracking = False
+        self.bindObjects()
+        return sorted(self.AccessedBranches)
         
     def initializeTuple(self,tree):
         """The initial setup of the caching is done here. Branches in the TTree may be deactivated using SetBranchStatus to
@@ -19,6 +83,7 @@ class TupleReader(object):
         """
         self.Tree = tree
         self.Tree.SetBranchStatus("*",0)
+        self.ActiveBranches = []
         
         #EventInfo 
         self.eventNumber      = self.activate("i", "eventNumber",            1)
@@ -47,19 +112,19 @@ class TupleReader(object):
         max_Lep = self.GetMaximum("lep_n")
         max_Lep = min(abs(max_Lep), 20)
         self.Lep_n         = self.activate("i", "lep_n",                    1)
-        self.Lep_pt        = self.activate("f", "lep_pt",                   max_Lep) 
-        self.Lep_eta       = self.activate("f", "lep_eta",                  max_Lep) 
-        self.Lep_phi       = self.activate("f", "lep_phi",                  max_Lep)
-        self.Lep_e         = self.activate("f", "lep_E",                    max_Lep)
-        self.Lep_pdgid     = self.activate("i", "lep_type",                 max_Lep)
-        self.Lep_charge    = self.activate("f", "lep_charge",               max_Lep)
-        self.Lep_ptcone30  = self.activate("f", "lep_ptcone30",             max_Lep)
-        self.Lep_etcone20  = self.activate("f", "lep_etcone20",             max_Lep)                    
-        self.Lep_d0        = self.activate("f", "lep_trackd0pvunbiased",    max_Lep)
-        self.Lep_d0Sig     = self.activate("f", "lep_tracksigd0pvunbiased", max_Lep)
-        self.Lep_trigMatch = self.activate("b", "lep_trigMatched",          max_Lep)
-        self.Lep_z0        = self.activate("f", "lep_z0",                   max_Lep)
-        self.Lep_isTight   = self.activate("b", "lep_isTight",              max_Lep)
+        self.Lep_pt        = self.activate("f", "lep_pt",                   max_Lep, "lep_n") 
+        self.Lep_eta       = self.activate("f", "lep_eta",                  max_Lep, "lep_n") 
+        self.Lep_phi       = self.activate("f", "lep_phi",                  max_Lep, "lep_n")
+        self.Lep_e         = self.activate("f", "lep_E",                    max_Lep, "lep_n")
+        self.Lep_pdgid     = self.activate("i", "lep_type",                 max_Lep, "lep_n")
+        self.Lep_charge    = self.activate("f", "lep_charge",               max_Lep, "lep_n")
+        self.Lep_ptcone30  = self.activate("f", "lep_ptcone30",             max_Lep, "lep_n")
+        self.Lep_etcone20  = self.activate("f", "lep_etcone20",             max_Lep, "lep_n")                    
+        self.Lep_d0        = self.activate("f", "lep_trackd0pvunbiased",    max_Lep, "lep_n")
+        self.Lep_d0Sig     = self.activate("f", "lep_tracksigd0pvunbiased", max_Lep, "lep_n")
+        self.Lep_trigMatch = self.activate("b", "lep_trigMatched",          max_Lep, "lep_n")
+        self.Lep_z0        = self.activate("f", "lep_z0",                   max_Lep, "lep_n")
+        self.Lep_isTight   = self.activate("b", "lep_isTight",              max_Lep, "lep_n")
 
         self.Leptons = [Lepton(i,self) for i in range(0,max_Lep)]
 
@@ -68,14 +133,14 @@ class TupleReader(object):
         max_Jet = self.GetMaximum("alljet_n")
         max_Jet = min(abs(max_Jet), 20)
         self.Jet_n        = self.activate("i", "alljet_n",     1)
-        self.Jet_pt       = self.activate("f", "jet_pt",       max_Jet)
-        self.Jet_eta      = self.activate("f", "jet_eta",      max_Jet)
-        self.Jet_e        = self.activate("f", "jet_E",        max_Jet)
-        self.Jet_flag     = self.activate("i", "jet_flag",     max_Jet)
-        self.Jet_phi      = self.activate("f", "jet_phi",      max_Jet)
-        self.Jet_mass     = self.activate("f", "jet_m",        max_Jet)
-        self.Jet_jvt      = self.activate("f", "jet_jvt",      max_Jet)
-        self.Jet_mv2c10   = self.activate("f", "jet_MV2c10",   max_Jet) 
+        self.Jet_pt       = self.activate("f", "jet_pt",       max_Jet, "alljet_n")
+        self.Jet_eta      = self.activate("f", "jet_eta",      max_Jet, "alljet_n")
+        self.Jet_e        = self.activate("f", "jet_E",        max_Jet, "alljet_n")
+        self.Jet_flag     = self.activate("i", "jet_flag",     max_Jet, "alljet_n")
+        self.Jet_phi      = self.activate("f", "jet_phi",      max_Jet, "alljet_n")
+        self.Jet_mass     = self.activate("f", "jet_m",        max_Jet, "alljet_n")
+        self.Jet_jvt      = self.activate("f", "jet_jvt",      max_Jet, "alljet_n")
+        self.Jet_mv2c10   = self.activate("f", "jet_MV2c10",   max_Jet, "alljet_n") 
          
         self.Jets = [Jet(i, self) for i in range(0,max_Jet)]
          
@@ -84,18 +149,125 @@ class TupleReader(object):
         self.Met_phi  = self.activate( "f", "met_phi", 1)
         
         self.EtMiss = EtMiss(self)
+
+        self.bindObjects()
                 
                 
-    def activate(self, vartype,  branchname, maxlength):
+    def activate(self, vartype,  branchname, maxlength, counter = None):
         variable = array(vartype,[0]*maxlength)
+        self.Buffers[branchname] = variable
+        if self.BranchSelection is not None and branchname not in self.BranchSelection:
+          return InactiveBuffer(self, branchname, vartype, counter, variable)
+        self.enable(branchname, vartype, counter, variable)
+        if self.Tracking:
+          return TrackedBuffer(self.AccessedBranches, branchname, vartype, counter, variable)
+        return variable
+
+    def enable(self, branchname, vartype, counter, variable):
+        # object branches can only be read together with their counter
+        if counter is not None:
+          self.activateLate(counter)
         self.Tree.SetBranchStatus(branchname,1)
         self.Tree.SetBranchAddress( branchname, variable)   
-        return variable
+        if self.CacheBranches:
+          self.Tree.AddBranchToCache(branchname, True)
+        self.ActiveBranches.append((branchname, vartype, counter))
+
+    def activateLate(self, branchname):
+        """Activates a branch that was left out by the branch selection and rebinds its buffer to the datamember."""
+        for name, value in list(self.__dict__.items()):
+          if isinstance(value, InactiveBuffer) and value.BranchName == branchname:
+            self.enable(value.BranchName, value.VarType, value.Counter, value.Buffer)
+            setattr(self, name, value.Buffer)
+            self.bindObjects()
+            # the current entry has been read without this branch
+            entry = self.Tree.GetReadEntry()
+            if entry >= 0:
+              self.log("Branch " + branchname + " is not in the branch selection but accessed, activating it")
+              self.Tree.GetEntry(entry)
+            return value.Buffer
+        return None
     
-    # Used for a quick scan to get the largest value encountered in the tuple
+    def bindObjects(self):
+        """Binds the datamembers to the physics objects, has to be called whenever a datamember is replaced."""
+        # objects that are not created yet are bound at the end of initializeTuple
+        for physicsObject in [self.EventInfo, self.EtMiss] + self.Leptons + self.Jets:
+          if physicsObject is not None:
+            physicsObject.bind()
+
+    def getEntry(self, entry):
+        self.Event += 1
+        return self.Tree.GetEntry(entry)
+
+    # Per event memoization
+    def memoize(self, key, function, *args):
+        """Returns function(*args), which is computed at most once per event for a given key. The key has to identify
+        the quantity together with its arguments, e.g. ("WTransverseMass", lepton.idNr), as the memo is shared by all
+        analyses running on the reader.
+        """
+        if self.MemoEvent != self.Event:
+          self.Memo = {}
+          self.MemoEvent = self.Event
+        if key not in self.Memo:
+          self.Memo[key] = function(*args)
+        return self.Memo[key]
+
+    # Readout from chunks
+    def useChunks(self):
+        """Switches the reader to chunk mode, has to be called after initializeTuple. The physics objects are
+        replaced by ones that expect energies in GeV.
+        """
+        members = dict((id(value), name) for name, value in self.__dict__.items() if isinstance(value, array))
+        self.Members = dict((branchname, members[id(buffer)]) for branchname, buffer in self.Buffers.items()
+                            if id(buffer) in members)
+        self.Leptons = [ScaledLepton(i, self) for i in range(len(self.Leptons))]
+        self.Jets    = [ScaledJet(i, self) for i in range(len(self.Jets))]
+        self.EtMiss  = ScaledEtMiss(self)
+
+    def setChunk(self, chunk):
+        """Binds the datamembers to the arrays of the chunk, the physics objects index them with the position of the
+        current entry in the chunk. Only the counters are views on the current entry.
+        """
+        self.ChunkCounters = []
+        for branchname, vartype, counter in self.ActiveBranches:
+          values = chunk[branchname]
+          if branchname in self.EnergyBranches:
+            values = values*0.001
+          if branchname in ("lep_n", "alljet_n"):
+            self.ChunkCounters.append((self.Members[branchname], values))
+          else:
+            setattr(self, self.Members[branchname], values)
+        # relative isolation is computed from the values in MeV
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+          self.Lep_ptconerel30 = chunk["lep_ptcone30"]/chunk["lep_pt"]
+          self.Lep_etconerel20 = chunk["lep_etcone20"]/chunk["lep_pt"]
+        self.ChunkObjects = [(self.Leptons, chunk.offsets("lep_pt").tolist()), (self.Jets, chunk.offsets("jet_pt").tolist())]
+        self.bindObjects()
+
+    def setEntry(self, index):
+        """Points the counters and physics objects to entry index of the current chunk."""
+        self.Event += 1
+        members = self.__dict__
+        for member, values in self.ChunkCounters:
+          members[member] = values[index:index + 1]
+        self.EventInfo.Index = index
+        self.EtMiss.Index    = index
+        for physicsObjects, offsets in self.ChunkObjects:
+          first = offsets[index]
+          for physicsObject in physicsObjects[:offsets[index + 1] - first]:
+            physicsObject.Index = first + physicsObject.idNr
+
+    # Used for a quick scan to get the largest value encountered in the tuple, the per file maxima are
+    # taken from the metadata cache if one is available
     def GetMaximum(self,branchname):
+        if self.MetadataCache is not None:
+            filenames = [element.GetTitle() for element in self.Tree.GetListOfFiles()]
+            return max([self.MetadataCache.getMaximum(filename, branchname) for filename in filenames] + [0])
         self.Tree.SetBranchStatus(branchname,1)
-        return int(self.Tree.GetMaximum(branchname))
+        maximum = int(self.Tree.GetMaximum(branchname))
+        # the branch is activated again by activate if it is needed
+        self.Tree.SetBranchStatus(branchname,0)
+        return maximum
     
     # Functions to retrieve object collections (Tuplereader is called Store in the analysis code)
     def getEtMiss(self):
@@ -110,6 +282,46 @@ class TupleReader(object):
     def getJets(self):
         return self.Jets[:self.Jet_n[0]]
 
+    def log(self, message):
+        print time.ctime() + " TupleReader: " + message
+
+#===========================================================
+
+class TrackedBuffer(object):
+    """Wraps the buffer of an active branch and records each access to it."""
+    def __init__(self, accessed, branchname, vartype, counter, buffer):
+        super(TrackedBuffer, self).__init__()
+        self.Accessed   = accessed
+        self.BranchName = branchname
+        self.VarType    = vartype
+        self.Counter    = counter
+        self.Buffer     = buffer
+
+    def __getitem__(self, index):
+        self.Accessed.add(self.BranchName)
+        return self.Buffer[index]
+
+    def __len__(self):
+        return len(self.Buffer)
+
+#===========================================================
+
+class InactiveBuffer(object):
+    """Stands in for the buffer of an inactive branch. The first access activates the branch in the reader."""
+    def __init__(self, reader, branchname, vartype, counter, buffer):
+        super(InactiveBuffer, self).__init__()
+        self.Reader     = reader
+        self.BranchName = branchname
+        self.VarType    = vartype
+        self.Counter    = counter
+        self.Buffer     = buffer
+
+    def __getitem__(self, index):
+        return self.Reader.activateLate(self.BranchName)[index]
+
+    def __len__(self):
+        return len(self.Buffer)
+
 #===========================================================
 
 class EtMiss(object):
@@ -117,29 +329,55 @@ class EtMiss(object):
     Missing Transverse Momentum has only two variables, its magnitude (et) and its azimuthal angle (phi).
     It is used as a proxy for all particles that escaped detection (neutrinos and the likes).
     """
+    __slots__ = ("Branches", "Index", "Et", "Phi", "_tlv", "_tlvEvent", "_p4", "_p4Event")
+
     def __init__(self, branches):
         super(EtMiss, self).__init__()
-        self.Branches = branches
-        self._tlv     = None
+        self.Branches  = branches
+        self.Index     = 0
+        self._tlv      = None
+        self._tlvEvent = -1
+        self._p4       = None
+        self._p4Event  = -1
+
+    def bind(self):
+        self.Et  = self.Branches.Met_et
+        self.Phi = self.Branches.Met_phi
     
     def tlv(self):
       if self._tlv == None:
         self._tlv = ROOT.TLorentzVector()
-      if self.et() != self._tlv.Pt():
+      if self._tlvEvent != self.Branches.Event:
         self._tlv.SetPtEtaPhiE(self.et(), 0, self.phi(), self.et())
+        self._tlvEvent = self.Branches.Event
       return self._tlv
+
+    def p4(self):
+      if self._p4Event != self.Branches.Event:
+        self._p4 = Kinematics.FourMomentum.fromPtEtaPhiE(self.et(), 0, self.phi(), self.et())
+        self._p4Event = self.Branches.Event
+      return self._p4
     
     def et(self):
-      return self.Branches.Met_et[0]*0.001
+      return self.Et[self.Index]*0.001
 
     def phi(self):
-      return self.Branches.Met_phi[0]
+      return self.Phi[self.Index]
 
     def __str__(self):
         return "MET: et: %4.3f  phi: %4.3f" % (self.et(), self.phi())
 
 #===========================================================
 
+class ScaledEtMiss(EtMiss):
+    """Missing transverse momentum reading from chunk arrays in which the energies are already converted to GeV."""
+    __slots__ = ()
+
+    def et(self):
+      return self.Et[self.Index]
+
+#===========================================================
+
 class EventInfo(object):
     """EventInfo class holding information about the event
     Information that can be accessed may either be metadata about the event (eventNumber, runNumber),
@@ -147,42 +385,62 @@ class EventInfo(object):
     information that may be used for selection purposes (passGRL, hasGoodVertex, numberofVertices, triggeredByElectron, 
     triggeredByMuon)
     """
+    __slots__ = ("Branches", "Index", "EventNumber", "RunNumber", "McWeight", "SF_Pileup", "SF_Ele", "SF_Mu",
+                 "SF_Trigger", "PassGRL", "HasGoodVertex", "Pvxp_n", "Vxp_z", "TrigE", "TrigM")
+
     def __init__(self, branches):
         super(EventInfo, self).__init__()
         self.Branches = branches
+        self.Index    = 0
+
+    def bind(self):
+        branches = self.Branches
+        self.EventNumber   = branches.eventNumber
+        self.RunNumber     = branches.runNumber
+        self.McWeight      = branches.mcWeight
+        self.SF_Pileup     = branches.SF_Pileup
+        self.SF_Ele        = branches.SF_Ele
+        self.SF_Mu         = branches.SF_Mu
+        self.SF_Trigger    = branches.SF_Trigger
+        self.PassGRL       = branches.passGRL
+        self.HasGoodVertex = branches.hasGoodVertex
+        self.Pvxp_n        = branches.pvxp_n
+        self.Vxp_z         = branches.vxp_z
+        self.TrigE         = branches.trigE
+        self.TrigM         = branches.trigM
 
     def eventNumber(self):
-      return self.Branches.eventNumber[0]
+      return self.EventNumber[self.Index]
 
     def runNumber(self):
-      return self.Branches.runNumber[0]
+      return self.RunNumber[self.Index]
 
     def eventWeight(self):
-      return self.Branches.mcWeight[0]*self.Branches.SF_Pileup[0]
+      return self.McWeight[self.Index]*self.SF_Pileup[self.Index]
 
     def scalefactor(self):
-      return self.Branches.SF_Ele[0]*self.Branches.SF_Mu[0]*self.Branches.SF_Trigger[0]    
+      return self.SF_Ele[self.Index]*self.SF_Mu[self.Index]*self.SF_Trigger[self.Index]    
 
     def passGRL(self):
-      return self.Branches.passGRL[0]
+      return self.PassGRL[self.Index]
      
     def mcWeight(self):
-      return self.Branches.mcWeight[0]
+      return self.McWeight[self.Index]
     
     def hasGoodVertex(self):
-      return self.Branches.hasGoodVertex[0]
+      return self.HasGoodVertex[self.Index]
     
     def numberOfVertices(self):
-      return self.Branches.pvxp_n[0]
+      return self.Pvxp_n[self.Index]
 
     def primaryVertexPosition(self):
-      return self.Branches.vxp_z[0]
+      return self.Vxp_z[self.Index]
 
     def triggeredByElectron(self):
-      return self.Branches.trigE[0]
+      return self.TrigE[self.Index]
 
     def triggeredByMuon(self):
-      return self.Branches.trigM[0]
+      return self.TrigM[self.Index]
 
     def __str__(self):
         return "EventInfo: run: %i  event: %i  eventweight: %4.2f" % (self.runNumber(), self.eventNumber(), self.eventWeight())
@@ -195,114 +453,205 @@ class Lepton(object):
     negative values signify anti-particles) Accessible information includes the kinematics (pt, eta, phi, e),
     the quality of the reconstruction result (isTight), and auxillary information
     (pdgId, charge, isolation variables like isoptcone30, d0, z0...).
+    The arrays of the TupleReader are bound to the lepton by bind, Index is the position of the lepton in them.
     """
+    __slots__ = ("Branches", "idNr", "Index", "Pt", "Eta", "Phi", "E", "IsTight", "PdgId", "Charge", "Ptcone30",
+                 "Etcone20", "D0", "D0Sig", "TrigMatch", "Z0", "_tlv", "_tlvEvent", "_p4", "_p4Event")
+
     def __init__(self, idNr, branches):
         super(Lepton, self).__init__()
-        self.Branches = branches
-        self.idNr = idNr
-        self._tlv = None
+        self.Branches  = branches
+        self.idNr      = idNr
+        self.Index     = idNr
+        self._tlv      = None
+        self._tlvEvent = -1
+        self._p4       = None
+        self._p4Event  = -1
+
+    def bind(self):
+        branches = self.Branches
+        self.Pt        = branches.Lep_pt
+        self.Eta       = branches.Lep_eta
+        self.Phi       = branches.Lep_phi
+        self.E         = branches.Lep_e
+        self.IsTight   = branches.Lep_isTight
+        self.PdgId     = branches.Lep_pdgid
+        self.Charge    = branches.Lep_charge
+        self.Ptcone30  = branches.Lep_ptcone30
+        self.Etcone20  = branches.Lep_etcone20
+        self.D0        = branches.Lep_d0
+        self.D0Sig     = branches.Lep_d0Sig
+        self.TrigMatch = branches.Lep_trigMatch
+        self.Z0        = branches.Lep_z0
 
     def tlv(self):
       if self._tlv == None:
         self._tlv = ROOT.TLorentzVector()
-      if self.pt() != self._tlv.Pt():
+      if self._tlvEvent != self.Branches.Event:
         self._tlv.SetPtEtaPhiE(self.pt(), self.eta(), self.phi(), self.e())
+        self._tlvEvent = self.Branches.Event
       return self._tlv
+
+    def p4(self):
+      if self._p4Event != self.Branches.Event:
+        self._p4 = Kinematics.FourMomentum.fromPtEtaPhiE(self.pt(), self.eta(), self.phi(), self.e())
+        self._p4Event = self.Branches.Event
+      return self._p4
       
     def pt(self):
-      return self.Branches.Lep_pt[self.idNr]*0.001
+      return self.Pt[self.Index]*0.001
 
     def eta(self):
-      return self.Branches.Lep_eta[self.idNr]
+      return self.Eta[self.Index]
 
     def phi(self):
-      return self.Branches.Lep_phi[self.idNr]
+      return self.Phi[self.Index]
 
     def e(self):
-      return self.Branches.Lep_e[self.idNr]*0.001
+      return self.E[self.Index]*0.001
 
     def isTight(self):
-      return self.Branches.Lep_isTight[self.idNr]
+      return self.IsTight[self.Index]
 
     def pdgId(self):
-      return self.Branches.Lep_pdgid[self.idNr]
+      return self.PdgId[self.Index]
  
     def charge(self):
-      return self.Branches.Lep_charge[self.idNr]
+      return self.Charge[self.Index]
     
     def isoptcone30(self):
-      return self.Branches.Lep_ptcone30[self.idNr]                
+      return self.Ptcone30[self.Index]                
 
     def isoetcone20(self):
-      return self.Branches.Lep_etcone20[self.idNr]                
+      return self.Etcone20[self.Index]                
 
     def isoptconerel30(self):
-      return self.Branches.Lep_ptcone30[self.idNr]/self.Branches.Lep_pt[self.idNr]                
+      return self.Ptcone30[self.Index]/self.Pt[self.Index]                
 
     def isoetconerel20(self):
-      return self.Branches.Lep_etcone20[self.idNr]/self.Branches.Lep_pt[self.idNr]                
+      return self.Etcone20[self.Index]/self.Pt[self.Index]                
 
     def d0(self):
-      return self.Branches.Lep_d0[self.idNr]
+      return self.D0[self.Index]
     
     def d0Significance(self):
-      return self.Branches.Lep_d0Sig[self.idNr]
+      return self.D0Sig[self.Index]
     
     def isTriggerMatched(self):
-      return self.Branches.Lep_trigMatch[self.idNr]
+      return self.TrigMatch[self.Index]
 
     def z0(self):
-      return self.Branches.Lep_z0[self.idNr]
+      return self.Z0[self.Index]
          
     def __str__(self):
         return "Lepton %d: pdgId: %d  pt: %4.3f  eta: %4.3f  phi: %4.3f" % (self.idNr, self.pdgId(), self.pt(), self.eta(), self.phi())
         
 #===========================================================
 
+class ScaledLepton(Lepton):
+    """Lepton reading from chunk arrays in which the energies are already converted to GeV."""
+    __slots__ = ("Ptconerel30", "Etconerel20")
+
+    def bind(self):
+      super(ScaledLepton, self).bind()
+      self.Ptconerel30 = self.Branches.Lep_ptconerel30
+      self.Etconerel20 = self.Branches.Lep_etconerel20
+
+    def pt(self):
+      return self.Pt[self.Index]
+
+    def e(self):
+      return self.E[self.Index]
+
+    def isoptconerel30(self):
+      return self.Ptconerel30[self.Index]
+
+    def isoetconerel20(self):
+      return self.Etconerel20[self.Index]
+
+#===========================================================
+
 class Jet(object):
     """Jet objects have accessors regarding their kinematic information (pt, eta, phi, e), their properties (m), and
     auxillary information (mv2c10, jvt). Truth information regarding the flavour of the quark they com from (truepdgid)
     and whether they were matched to a true jet (isTrueJet) is available.
+    The arrays of the TupleReader are bound to the jet by bind, Index is the position of the jet in them.
     """
+    __slots__ = ("Branches", "idNr", "Index", "Pt", "Eta", "Phi", "E", "Mass", "Mv2c10", "Jvt",
+                 "_tlv", "_tlvEvent", "_p4", "_p4Event")
+
     def __init__(self, idNr, branches):
         super(Jet, self).__init__()
-        self.idNr = idNr
-        self.Branches = branches
-        self._tlv = None
+        self.idNr      = idNr
+        self.Index     = idNr
+        self.Branches  = branches
+        self._tlv      = None
+        self._tlvEvent = -1
+        self._p4       = None
+        self._p4Event  = -1
+
+    def bind(self):
+        branches = self.Branches
+        self.Pt     = branches.Jet_pt
+        self.Eta    = branches.Jet_eta
+        self.Phi    = branches.Jet_phi
+        self.E      = branches.Jet_e
+        self.Mass   = branches.Jet_mass
+        self.Mv2c10 = branches.Jet_mv2c10
+        self.Jvt    = branches.Jet_jvt
 
     def tlv(self):
       if self._tlv == None:
         self._tlv = ROOT.TLorentzVector()
-      if self.pt() != self._tlv.Pt():
+      if self._tlvEvent != self.Branches.Event:
         self._tlv.SetPtEtaPhiE(self.pt(), self.eta(), self.phi(), self.e())
+        self._tlvEvent = self.Branches.Event
       return self._tlv
+
+    def p4(self):
+      if self._p4Event != self.Branches.Event:
+        self._p4 = Kinematics.FourMomentum.fromPtEtaPhiE(self.pt(), self.eta(), self.phi(), self.e())
+        self._p4Event = self.Branches.Event
+      return self._p4
     
     def pt(self):
-      return self.Branches.Jet_pt[self.idNr]*0.001
+      return self.Pt[self.Index]*0.001
     
     def eta(self):
-      return self.Branches.Jet_eta[self.idNr]
+      return self.Eta[self.Index]
     
     def phi(self):
-      return self.Branches.Jet_phi[self.idNr]
+      return self.Phi[self.Index]
     
     def e(self):
-      return self.Branches.Jet_e[self.idNr]*0.001
+      return self.E[self.Index]*0.001
     
     def m(self):
-      return self.Branches.Jet_mass[self.idNr]
+      return self.Mass[self.Index]
 
     def mv2c10(self):
-      return self.Branches.Jet_mv2c10[self.idNr] 
+      return self.Mv2c10[self.Index] 
       
     def jvt(self):
-      return self.Branches.Jet_jvt[self.idNr]
+      return self.Jvt[self.Index]
 
     def truepdgid(self):
-      return self.Branches.Jet_trueflav[self.idNr]
+      return self.Branches.Jet_trueflav[self.Index]
 
     def isTrueJet(self):
-      return bool(self.Branches.Jet_truthMatched[self.idNr])
+      return bool(self.Branches.Jet_truthMatched[self.Index])
          
     def __str__(self):
         return "Jet %d: pt: %4.3f  eta: %4.3f  phi: %4.3f" % (self.idNr, self.pt(), self.eta(), self.phi())
+
+#===========================================================
+
+class ScaledJet(Jet):
+    """Jet reading from chunk arrays in which the energies are already converted to GeV."""
+    __slots__ = ()
+
+    def pt(self):
+      return self.Pt[self.Index]
+
+    def e(self):
+      return self.E[self.Index]
@@ -1,6 +1,9 @@
 import ROOT
+import numpy
+
 import Analysis
 import AnalysisHelpers as AH
+import Kinematics
 
 #======================================================================
         
@@ -8,6 +11,8 @@ class WAnalysis(Analysis.Analysis):
   """Single W Analysis based loosely on an ATLAS analysis measuring the charge asymmetry in
   W events. The W boson is expected to decay to leptons.
   """
+  Cuts = ["no cut", "EventCuts", "1 high pt Leptons"]
+
   def __init__(self, store):
       super(WAnalysis, self).__init__(store)
 
@@ -45,11 +50,11 @@ class WAnalysis(Analysis.Analysis):
       self.countEvent("no cut", weight)
       
       # apply standard event based selection
-      if not AH.StandardEventCuts(eventinfo): return False
+      if not AH.passStandardEventCuts(self.Store): return False
       self.countEvent("EventCuts", weight)
       
       # Lepton Requirements
-      goodLeptons = AH.selectAndSortContainer(self.Store.getLeptons(), AH.isGoodLepton, lambda p: p.pt())
+      goodLeptons = AH.getGoodLeptons(self.Store)
       if not (len(goodLeptons) == 1): return False
       self.countEvent("1 high pt Leptons", weight)
 
@@ -57,14 +62,15 @@ class WAnalysis(Analysis.Analysis):
 
       # cut on W boson candidate
       etmiss = self.Store.getEtMiss()
-      if not AH.WTransverseMass(lepton, etmiss) > 30: return False;
+      mtw = self.Store.memoize(("WTransverseMass", lepton.idNr), AH.WTransverseMass, lepton, etmiss)
+      if not mtw > 30: return False;
       if not etmiss.et() > 30: return False
       
       self.hist_vxp_z.Fill(eventinfo.primaryVertexPosition(), weight)
       self.hist_pvxp_n.Fill(eventinfo.numberOfVertices(), weight)
       
       # W boson histogram
-      self.hist_WtMass.Fill(AH.WTransverseMass(lepton, etmiss), weight)
+      self.hist_WtMass.Fill(mtw, weight)
 
       # missing transverse momentum histogram
       self.hist_etmiss.Fill(etmiss.et(), weight)
@@ -82,7 +88,7 @@ class WAnalysis(Analysis.Analysis):
       self.hist_lepd0.Fill(lepton.d0(), weight)
       
       # Jet Histograms
-      jets = AH.selectAndSortContainer(self.Store.getJets(), AH.isGoodJet, lambda p: p.pt())
+      jets = AH.getGoodJets(self.Store)
       self.hist_njets.Fill(len(jets), weight)
       [self.hist_jetm.Fill(jet.m(), weight) for jet in jets]
       [self.hist_jetspt.Fill(jet.pt(), weight) for jet in jets]
@@ -92,6 +98,69 @@ class WAnalysis(Analysis.Analysis):
       [self.hist_jetphi.Fill(jet.phi(), weight) for jet in jets]
       
       return True
+
+  def analyzeBatch(self, chunk, weights):
+      self.countEvents("no cut", weights)
+
+      # apply standard event based selection
+      selected = AH.getStandardEventCutsMask(chunk)
+      self.countEvents("EventCuts", weights, selected)
+
+      # Lepton Requirements
+      leptons, leptonOffsets = AH.getGoodLeptonsJagged(chunk)
+      # the shared mask must not be modified in place
+      selected = selected & (numpy.diff(leptonOffsets) == 1)
+      self.countEvents("1 high pt Leptons", weights, selected)
+
+      events = numpy.flatnonzero(selected)
+      lepton = leptons[leptonOffsets[events]]
+
+      # cut on W boson candidate
+      leptonPt = chunk["lep_pt"][lepton]*0.001
+      etmiss   = chunk["met_et"][events]*0.001
+      wtMass   = Kinematics.transverseMass(leptonPt, chunk["lep_phi"][lepton], etmiss, chunk["met_phi"][events])
+      passed   = (wtMass > 30) & (etmiss > 30)
+      events, lepton, leptonPt, etmiss, wtMass = events[passed], lepton[passed], leptonPt[passed], etmiss[passed], wtMass[passed]
+      weight = weights[events]
+
+      self.fillBatch(self.hist_vxp_z, chunk["vxp_z"][events], weight)
+      self.fillBatch(self.hist_pvxp_n, chunk["pvxp_n"][events], weight)
+
+      # W boson histogram
+      self.fillBatch(self.hist_WtMass, wtMass, weight)
+
+      # missing transverse momentum histogram
+      self.fillBatch(self.hist_etmiss, etmiss, weight)
+
+      # lepton histograms
+      self.fillBatch(self.hist_leptpt, leptonPt, weight)
+      self.fillBatch(self.hist_lepteta, chunk["lep_eta"][lepton], weight)
+      self.fillBatch(self.hist_leptE, chunk["lep_E"][lepton]*0.001, weight)
+      self.fillBatch(self.hist_leptphi, chunk["lep_phi"][lepton], weight)
+      self.fillBatch(self.hist_leptch, chunk["lep_charge"][lepton], weight)
+      self.fillBatch(self.hist_leptID, chunk["lep_type"][lepton], weight)
+      self.fillBatch(self.hist_leptptc, chunk["lep_ptcone30"][lepton]/chunk["lep_pt"][lepton], weight)
+      self.fillBatch(self.hist_leptetc, chunk["lep_etcone20"][lepton]/chunk["lep_pt"][lepton], weight)
+      self.fillBatch(self.hist_lepz0, chunk["lep_z0"][lepton], weight)
+      self.fillBatch(self.hist_lepd0, chunk["lep_trackd0pvunbiased"][lepton], weight)
+
+      # Jet Histograms
+      jets, jetOffsets = AH.getGoodJetsJagged(chunk)
+      jetCounts = numpy.diff(jetOffsets)
+      jetEvent  = numpy.repeat(numpy.arange(len(chunk)), jetCounts)
+      passedEvent = numpy.zeros(len(chunk), dtype=bool)
+      passedEvent[events] = True
+      jetSelected = passedEvent[jetEvent]
+      jets, jetWeight = jets[jetSelected], weights[jetEvent[jetSelected]]
+      self.fillBatch(self.hist_njets, jetCounts[events], weight)
+      self.fillBatch(self.hist_jetm, chunk["jet_m"][jets], jetWeight)
+      self.fillBatch(self.hist_jetspt, chunk["jet_pt"][jets]*0.001, jetWeight)
+      self.fillBatch(self.hist_jetJVT, chunk["jet_jvt"][jets], jetWeight)
+      self.fillBatch(self.hist_jeteta, chunk["jet_eta"][jets], jetWeight)
+      self.fillBatch(self.hist_jetmv2c10, chunk["jet_MV2c10"][jets], jetWeight)
+      self.fillBatch(self.hist_jetphi, chunk["jet_phi"][jets], jetWeight)
+
+      return passedEvent
   
   def finalize(self):
       pass
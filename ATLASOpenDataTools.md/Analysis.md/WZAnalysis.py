@@ -1,14 +1,18 @@
 import ROOT
-import itertools 
 
 import Analysis
 import AnalysisHelpers as AH
+import Combinatorics
 import Constants
 
 #======================================================================
         
 class WZAnalysis(Analysis.Analysis):
   """Analysis searching for the pair production of WZ with both boson decaying to leptons"""
+  RequiredBranches = (AH.StandardEventBranches + AH.GoodLeptonBranches + AH.EtMissBranches +
+                      ["lep_z0", "lep_trackd0pvunbiased", "vxp_z", "pvxp_n"])
+  Cuts = ["EventCuts", "3 high pt Leptons"]
+
   def __init__(self, store):
       super(WZAnalysis, self).__init__(store)
 
@@ -35,25 +39,16 @@ class WZAnalysis(Analysis.Analysis):
 
 
   def ZWindow(self, lep1, lep2):
-      return abs((lep1.tlv()+lep2.tlv()).M() - Constants.Z_Mass)
-    
-  def TestWZCandidate(self, candidate):
-      return self.ZWindow(candidate[0], candidate[1])
+      return abs((lep1.p4()+lep2.p4()).m() - Constants.Z_Mass)
 
   def WZCandidate(self, leptons):
-      def isValidCandidate(lep1, lep2):
-          if lep1.charge()*lep2.charge() > 0: return False
-          if abs(lep1.pdgId()) != abs(lep2.pdgId()): return False
-          return True
-    
-      bestCandidate = None
-      for p in itertools.permutations(leptons, 3):
-         if not isValidCandidate(p[0], p[1]): continue
-         if bestCandidate is None:
-             bestCandidate = p            
-         if self.TestWZCandidate(p) < self.TestWZCandidate(bestCandidate):
-             bestCandidate = p
-      return bestCandidate
+      # the Z candidate is the opposite-sign same-flavour pair closest to the Z mass, the W lepton the remaining one
+      pairs = Combinatorics.oppositeSignSameFlavourPairs(leptons)
+      best = Combinatorics.bestPair(pairs, Combinatorics.pairWindows(leptons, pairs, Constants.Z_Mass))
+      if best is None: return None
+      others = [n for n in range(len(leptons)) if n not in best]
+      if not others: return None
+      return (leptons[best[0]], leptons[best[1]], leptons[others[0]])
     
   def analyze(self):
       # retrieving objects
@@ -61,11 +56,11 @@ class WZAnalysis(Analysis.Analysis):
       weight = eventinfo.scalefactor()*eventinfo.eventWeight() if not self.getIsData() else 1
             
       # apply standard event based selection
-      if not AH.StandardEventCuts(eventinfo): return False
+      if not AH.passStandardEventCuts(self.Store): return False
       self.countEvent("EventCuts", weight)
        
       # Lepton Requirements
-      goodLeptons = AH.selectAndSortContainer(self.Store.getLeptons(), AH.isGoodLepton, lambda p: p.pt())
+      goodLeptons = AH.getGoodLeptons(self.Store)
       if not (len(goodLeptons) == 3): return False
       self.countEvent("3 high pt Leptons", weight)
 
@@ -80,7 +75,8 @@ class WZAnalysis(Analysis.Analysis):
 
       # test candidate for WZ system
       if not self.ZWindow(z1Lepton, z2Lepton) < 10: return False;
-      if not AH.WTransverseMass(wLepton, etmiss) > 30: return False;
+      mtw = self.Store.memoize(("WTransverseMass", wLepton.idNr), AH.WTransverseMass, wLepton, etmiss)
+      if not mtw > 30: return False;
 
       # histograms for missing et
       self.hist_etmiss.Fill(etmiss.et(),weight)  
@@ -90,8 +86,8 @@ class WZAnalysis(Analysis.Analysis):
       self.hist_pvxp_n.Fill(eventinfo.numberOfVertices(), weight)
       
       # WZ system histograms
-      self.invMass.Fill((z1Lepton.tlv() + z2Lepton.tlv()).M(), weight)
-      self.WtMass.Fill(AH.WTransverseMass(wLepton, etmiss), weight)
+      self.invMass.Fill((z1Lepton.p4() + z2Lepton.p4()).m(), weight)
+      self.WtMass.Fill(mtw, weight)
 
       # lepton histograms
       self.hist_leptn.Fill(len(goodLeptons), weight)
@@ -1,38 +1,31 @@
 import ROOT
-import itertools 
 
 import Analysis
 import AnalysisHelpers as AH
+import Combinatorics
 import Constants
 
 #======================================================================
         
 class ZZAnalysis(Analysis.Analysis):
   """Analysis searching for the pair production of two Z bosons decaying to leptons."""
+  Cuts = ["no cut", "EventCuts", "all passed"]
+
   def __init__(self, store):
       super(ZZAnalysis, self).__init__(store)
 
   
   def initialize(self):
-      self.invMass1          =  self.addHistogram("invMass1",          ROOT.TH1D("invMass1",     "Jet Azimuthal Angle ; #phi^{jet}; Jets", 32, -3.2, 3.2))
-      self.invMass2          =  self.addHistogram("invMass2",          ROOT.TH1D("invMass2",     "Invariant Mass of the Z boson 2;M_{Z2} [GeV]; Events", 30, 60,120))
-      self.hist_jetphi       =  self.addHistogram("jet_phi",           ROOT.TH1D("jet_phi",      "Invariant Mass of the Z boson 1;M_{Z1} [GeV]; Events", 30, 60,120))
+      self.declareHistogram("invMass1", "mZ1", histogram = ROOT.TH1D("invMass1",     "Invariant Mass of the Z boson 1;M_{Z1} [GeV]; Events", 30, 60,120))
+      self.declareHistogram("invMass2", "mZ2", histogram = ROOT.TH1D("invMass2",     "Invariant Mass of the Z boson 2;M_{Z2} [GeV]; Events", 30, 60,120))
+      self.declareHistogram("jet_phi", "phi", "jets")
 
-      self.hist_leptn       =  self.addStandardHistogram("lep_n")
-      self.hist_leptpt      =  self.addStandardHistogram("lep_pt")
-      self.hist_lepteta     =  self.addStandardHistogram("lep_eta")
-      self.hist_leptE       =  self.addStandardHistogram("lep_E")
-      self.hist_leptphi     =  self.addStandardHistogram("lep_phi")
-      self.hist_leptch      =  self.addStandardHistogram("lep_charge")
-      self.hist_leptID      =  self.addStandardHistogram("lep_type")
-      self.hist_leptptc     =  self.addStandardHistogram("lep_ptconerel30")
-      self.hist_leptetc     =  self.addStandardHistogram("lep_etconerel20")
-      self.hist_lepz0       =  self.addStandardHistogram("lep_z0")
-      self.hist_lepd0       =  self.addStandardHistogram("lep_d0")
+      self.declareHistogram("lep_n", len, "leptons")
+      self.declareHistograms("lep", AH.LeptonHistograms, "leptons")
 
-      self.hist_etmiss      = self.addStandardHistogram("etmiss")
-      self.hist_vxp_z       = self.addStandardHistogram("vxp_z")
-      self.hist_pvxp_n      = self.addStandardHistogram("pvxp_n")
+      self.declareHistogram("etmiss", "et", "etmiss")
+      self.declareHistogram("vxp_z", "primaryVertexPosition", "eventinfo")
+      self.declareHistogram("pvxp_n", "numberOfVertices", "eventinfo")
 
     
   def analyze(self):
@@ -42,12 +35,12 @@ class ZZAnalysis(Analysis.Analysis):
       self.countEvent("no cut", weight)
 
       # apply standard event based selection
-      if not AH.StandardEventCuts(eventinfo): return False
+      if not AH.passStandardEventCuts(self.Store): return False
       self.countEvent("EventCuts", weight)
       
 
       # retrieve Leptons  
-      goodLeptons = AH.selectAndSortContainer(self.Store.getLeptons(), isGoodLepton, lambda p: p.pt())
+      goodLeptons = AH.getGoodLeptons(self.Store, isGoodLepton)
       if not len(goodLeptons) >= 4: return False
       if not goodLeptons[0].pt() > 25: return False
 
@@ -59,33 +52,10 @@ class ZZAnalysis(Analysis.Analysis):
       if self.DoubleZWindow(candidate) > 30: return False;
       self.countEvent("all passed", weight)
  
-      # vertex histograms
-      self.hist_vxp_z.Fill(eventinfo.primaryVertexPosition(), weight)
-      self.hist_pvxp_n.Fill(eventinfo.numberOfVertices(), weight)
-
-      # missing transverse momentum histograms
-      etmiss    = self.Store.getEtMiss()
-      self.hist_etmiss.Fill(etmiss.et(),weight)
-      
-      # ZZ system histograms
-      self.invMass1.Fill((candidate[0].tlv() + candidate[1].tlv()).M(), weight)
-      self.invMass2.Fill((candidate[2].tlv() + candidate[3].tlv()).M(), weight)
-      
-      # lepton histograms
-      self.hist_leptn.Fill(len(goodLeptons), weight)
-      [self.hist_leptpt.Fill(lep.pt(), weight) for lep in goodLeptons]
-      [self.hist_lepteta.Fill(lep.eta(), weight) for lep in goodLeptons]
-      [self.hist_leptE.Fill(lep.e(), weight) for lep in goodLeptons]
-      [self.hist_leptphi.Fill(lep.phi(), weight) for lep in goodLeptons]
-      [self.hist_leptch.Fill(lep.charge(), weight) for lep in goodLeptons]
-      [self.hist_leptID.Fill(lep.pdgId(), weight) for lep in goodLeptons]
-      [self.hist_leptptc.Fill(lep.isoptconerel30(), weight) for lep in goodLeptons]
-      [self.hist_leptetc.Fill(lep.isoetconerel20(), weight) for lep in goodLeptons]
-      [self.hist_lepz0.Fill(lep.z0(), weight) for lep in goodLeptons]
-      [self.hist_lepd0.Fill(lep.d0(), weight) for lep in goodLeptons]
-
-      # jet histograms
-      self.hist_jetphi.Fill(jet.phi(), weight)
+      # vertex, missing Et, ZZ system, lepton and jet histograms
+      self.fillStage("final", weight, eventinfo=eventinfo, etmiss=self.Store.getEtMiss(),
+                     mZ1=(candidate[0].p4() + candidate[1].p4()).m(), mZ2=(candidate[2].p4() + candidate[3].p4()).m(),
+                     leptons=goodLeptons, jets=AH.getGoodJets(self.Store))
 
       return True
   
@@ -93,26 +63,17 @@ class ZZAnalysis(Analysis.Analysis):
       pass
     
   def ZWindow(self, lep1, lep2):
-      return abs((lep1.tlv()+lep2.tlv()).M() - Constants.Z_Mass)
+      return abs((lep1.p4()+lep2.p4()).m() - Constants.Z_Mass)
     
   def DoubleZWindow(self, candidate):
       return self.ZWindow(candidate[0], candidate[1]) + self.ZWindow(candidate[2], candidate[3])
 
   def ZZCandidate(self, leptons):
-      def isValidCandidate(lep1, lep2):
-          if lep1.charge()*lep2.charge() > 0: return False
-          if abs(lep1.pdgId()) != abs(lep2.pdgId()): return False
-          return True
-    
-      bestCandidate = None
-      for p in itertools.permutations(leptons, 4):
-         if not isValidCandidate(p[0], p[1]): continue
-         if not isValidCandidate(p[2], p[3]): continue 
-         if bestCandidate is None:
-             bestCandidate = p            
-         if self.DoubleZWindow(p) < self.DoubleZWindow(bestCandidate):
-             bestCandidate = p
-      return bestCandidate
+      # the two Z candidates are the disjoint opposite-sign same-flavour pairs with the smallest DoubleZWindow
+      pairs = Combinatorics.oppositeSignSameFlavourPairs(leptons)
+      best = Combinatorics.bestDisjointPairs(pairs, Combinatorics.pairWindows(leptons, pairs, Constants.Z_Mass))
+      if best is None: return None
+      return tuple(leptons[n] for n in best[0] + best[1])
 
   
 def isGoodLepton(Lepton):
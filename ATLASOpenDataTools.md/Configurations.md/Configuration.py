@@ -3,7 +3,20 @@ Job = {
     "Analysis"        : "TTbarAnalysis",
     "Fraction"        : .1,
     "MaxEvents"       : 1234567890,
-    "OutputDirectory" : "results/"
+    "OutputDirectory" : "results/",
+    "BatchSize"       : 0,
+    "EventChunkSize"  : 0,
+    "SkimDirectory"   : "",
+    "SkimPreselection": "StandardPreselection",
+    "MetadataCache"   : ".metadata_cache.json",
+    "InputCatalog"    : ".input_catalog.json",
+    "BranchProbeEvents": 1000,
+    "CacheSize"       : 30000000,
+    "CacheLearnEntries": 0,
+    "Prefetching"     : False,
+    "ColumnarCache"   : "",
+    "HistogramBackend": "ROOT",
+    "CutflowTiming"   : False
 }
 
 #VBSAnalysis
@@ -0,0 +1,59 @@
+import argparse
+import importlib
+import os
+import sys
+import ROOT
+import Analysis.ColumnarCache as ColumnarCache
+import Analysis.TupleReader as TupleReader
+import Analysis.Disclaimer as DC
+import RunScript
+
+def convertProcess(configuration, processName, fileLocation, directory, chunkSize, force):
+    # the files are chained in the same order as by the jobs, so entry numbers refer to the same events
+    inputFiles = RunScript.BuildJob(configuration.Job, processName, fileLocation).getInputFiles()
+    if len(inputFiles) == 0:
+        print "No input files found for %s, skipping it" % processName
+        return
+    cache = ColumnarCache.ColumnarCache(os.path.join(directory, processName))
+    if not force and cache.isValid(inputFiles):
+        print "Columnar cache of %s is up to date" % processName
+        return
+    tree = ROOT.TChain("mini")
+    for filename in inputFiles:
+        tree.Add(filename)
+    # the TupleReader activates all branches known to the analysis code
+    store = TupleReader.TupleReader()
+    store.initializeTuple(tree)
+    cache.write(tree, store.ActiveBranches, inputFiles, chunkSize)
+
+#======================================================================
+def main( argv ):
+    """
+    Main function to be executed when starting the code.
+    """
+    DC.printDisclaimer()
+    ROOT.gROOT.SetBatch()
+
+    parser = argparse.ArgumentParser( description = 'Converts the input tuples into the columnar cache read by the analysis code' )
+    parser.add_argument('-c', '--configfile', default="Configurations/Configuration.py", type=str,   help='configuration file listing the processes')
+    parser.add_argument('-s', '--samples',    default=""                               , type=str,   help='string with comma separated list of samples to convert')
+    parser.add_argument('-o', '--output',     default=""                               , type=str,   help='cache directory, overrides ColumnarCache of the configuration file')
+    parser.add_argument('-b', '--chunksize',  default=100000,                            type=int,   help='number of entries converted at once')
+    parser.add_argument('-f', '--force',      default=False,   action='store_const',     const=True, help='converts samples even if their cache is up to date')
+    args = parser.parse_args()
+
+    configModuleName = args.configfile.replace("/", ".").replace(".py","")
+    configuration = importlib.import_module(configModuleName)
+
+    directory = args.output if args.output != "" else configuration.Job.get("ColumnarCache", "")
+    if directory == "":
+        print "No cache directory given, use -o or set ColumnarCache in the configuration file"
+        sys.exit(1)
+
+    for processName, fileLocation in RunScript.buildProcessingDict(configuration, args.samples).items():
+        convertProcess(configuration, processName, fileLocation, directory, args.chunksize, args.force)
+    RunScript.SaveInputCatalog(configuration.Job)
+
+#======================================================================
+if __name__ == "__main__":
+    main( sys.argv[1:] )
@@ -0,0 +1,28 @@
+import argparse
+import sys
+import ROOT
+import Analysis.Merger as Merger
+import Analysis.Disclaimer as DC
+
+#======================================================================
+def main( argv ):
+    """
+    Main function to be executed when starting the code.
+    """
+    DC.printDisclaimer()
+    ROOT.gROOT.SetBatch()
+
+    parser = argparse.ArgumentParser( description = 'Merges partial analysis outputs (histograms and cutflows) into one file' )
+    parser.add_argument('target',                                                    type=str,   help='name of the merged output file')
+    parser.add_argument('sources',    nargs='+',                                     type=str,   help='partial output files to be merged')
+    parser.add_argument('-r', '--remove',     default=False,   action='store_const', const=True, help='removes the partial files after merging')
+    args = parser.parse_args()
+
+    counter = Merger.mergeOutputFiles(args.target, args.sources, args.remove)
+    if counter is None:
+        sys.exit(1)
+    counter.printResults()
+
+#======================================================================
+if __name__ == "__main__":
+    main( sys.argv[1:] )
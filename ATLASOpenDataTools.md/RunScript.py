@@ -4,9 +4,11 @@ import os
 import glob
 import ROOT
 import importlib
+import Analysis.InputCatalog as InputCatalog
 import Analysis.Job as Job
+import Analysis.Merger as Merger
+import Analysis.Scheduler as Scheduler
 import Analysis.Disclaimer as DC
-from multiprocessing import Pool 
 
 def buildProcessingDict(configuration, samples):
     if samples == "": 
@@ -21,13 +23,14 @@ def buildProcessingDict(configuration, samples):
     return processingDict
 
 def checkAnalysis(configuration, analysisOption):
-    analysisName = analysisOption if analysisOption != "" else configuration.Job["Analysis"]
-    try:
-        importedAnalysisModule = importlib.import_module("Analysis." + analysisName)
-        configuration.Job["Analysis"] = analysisName
-    except ImportError:
-        print "Error when trying to read the analysis code for %s. Please check name validity" % analysisName
-        sys.exit(1)
+    analysisNames = analysisOption if analysisOption != "" else configuration.Job["Analysis"]
+    for analysisName in [substring.strip() for substring in analysisNames.split(',')]:
+        try:
+            importedAnalysisModule = importlib.import_module("Analysis." + analysisName)
+        except ImportError:
+            print "Error when trying to read the analysis code for %s. Please check name validity" % analysisName
+            sys.exit(1)
+    configuration.Job["Analysis"] = analysisNames
 
 def BuildJob(configuration, processName, fileLocation):
     job = Job.Job(processName, configuration, fileLocation )
@@ -35,9 +38,31 @@ def BuildJob(configuration, processName, fileLocation):
 
 
 def SortJobsBySize(jobs):  
-    def jobSize(job):
-        return sum([os.lstat(f).st_size for f in job.InputFiles])
-    return sorted(jobs, key=jobSize, reverse=True)
+    return sorted(jobs, key=lambda job: job.getInputSize(), reverse=True)
+
+def SaveInputCatalog(configuration):
+    """Saves the input locations resolved while setting up the jobs, so the workers and later runs can reuse them."""
+    if configuration.get("InputCatalog", "") != "":
+        InputCatalog.getCatalog(configuration["InputCatalog"]).save()
+
+def MergeSubJobs(jobs):
+    """Merges the output files and cutflows of jobs that were split into parts."""
+    parts = {}
+    for job in jobs:
+        if job.PartNumber is not None:
+            parts.setdefault(job.Name, []).append(job)
+
+    for processName, subJobs in parts.items():
+        subJobs.sort(key=lambda job: job.PartNumber)
+        for analysisName in subJobs[0].AnalysisNames:
+            target = subJobs[0].getOutputFileLocation(analysisName) + ".root"
+            sources = [job.getOutputFileLocation(analysisName, job.PartNumber) + ".root" for job in subJobs]
+            counter = Merger.mergeOutputFiles(target, sources)
+            if counter is not None:
+                counter.printResults()
+        if subJobs[0].SkimDirectory != "":
+            Merger.mergeTreeFiles(subJobs[0].getSkimFileLocation() + ".root",
+                                  [job.getSkimFileLocation(job.PartNumber) + ".root" for job in subJobs])
 
 def RunJob(job):
     job.run()
@@ -55,9 +80,10 @@ def main( argv ):
     parser.add_argument('-n', '--nWorkers',   default=4,                                 type=int,   help='number of workers' )  
     parser.add_argument('-p', '--parallel',   default=False,   action='store_const',     const=True, help='enables running in parallel')
     parser.add_argument('-c', '--configfile', default="Configurations/Configuration.py", type=str,   help='files to be analysed')
-    parser.add_argument('-a', '--analysis',   default=""                               , type=str,   help='overrides the analysis specified in configuration file')
+    parser.add_argument('-a', '--analysis',   default=""                               , type=str,   help='overrides the analysis specified in configuration file (comma separated list for several analyses)')
     parser.add_argument('-s', '--samples',    default=""                               , type=str,   help='string with comma separated list of samples to analyse')
     parser.add_argument('-o', '--output',     default=""                               , type=str,   help='name of the output directory')
+    parser.add_argument(      '--nosplit',    default=False,   action='store_const',     const=True, help='disables splitting large samples into sub-jobs in parallel mode')
     args = parser.parse_args()
     
     configModuleName = args.configfile.replace("/", ".").replace(".py","")
@@ -73,9 +99,10 @@ def main( argv ):
     if (args.parallel):
         configuration.Job["Batch"] = True
         jobs = [BuildJob(configuration.Job, processName, fileLocation) for processName, fileLocation in processingDict.items()]
-        jobs = SortJobsBySize(jobs)
-        pool = Pool(processes=args.nWorkers)              # start with n worker processes
-        pool.map(RunJob, jobs, chunksize=1)
+        scheduler = Scheduler.Scheduler(args.nWorkers, split = not args.nosplit)
+        scheduler.addJobs(SortJobsBySize(jobs) if args.nosplit else jobs)
+        SaveInputCatalog(configuration.Job)
+        MergeSubJobs(scheduler.run())
 
     else:
         for processName, fileLocation in processingDict.items():
@@ -0,0 +1,23 @@
+import pickle
+import pytest
+
+ROOT  = pytest.importorskip("ROOT")
+numpy = pytest.importorskip("numpy")
+
+import Analysis.HistManager as HistManager
+
+def test_pickle_numpy_backend():
+    """Histograms of the NumPy backend are returned from workers pickled, including values still in the buffer."""
+    manager = HistManager.HistManager("test")
+    manager.setBackend("NumPy")
+    histogram = manager.addStandardHistogram("lep_pt")
+    for value in (10., 30., 55.):
+        histogram.Fill(value, 2.)
+
+    copy = pickle.loads(pickle.dumps(histogram))
+    assert isinstance(copy, HistManager.BufferedHistogram)
+    assert copy.GetEntries() == 3
+    assert numpy.array_equal(copy.SumW, histogram.SumW)
+
+    copy.Fill(30., 1.)
+    assert copy.GetEntries() == 4